@@ -46,17 +46,10 @@ for composite_signal in config['Composite Signals']:
         pm.add_dataframe(signal)
         pm.add_translation_dictionary({key: list(signal.columns)})
 
-# Check data for expected ranges
-for key,value in config['Range'].items():
-    pm.check_range(value, key)
-
-# Check for stagnant data within a 1 hour moving window
-for key,value in config['Delta'].items():
-    pm.check_delta(value, 3600, key) 
-
-# Check for abrupt changes between consecutive time steps
-for key,value in config['Increment'].items():
-    pm.check_increment(value, key) 
+# Check data for expected ranges, stagnant data within a 1 hour moving 
+# window, and abrupt changes between consecutive time steps
+plan = pecos.monitoring.QCPlan(config, window=3600)
+plan.run(pm)
     
 # Compute the quality control index for A, B, C, and D
 mask = pm.mask[['A','B','C','D']]
@@ -17,6 +17,7 @@ import textwrap
 import os
 import logging
 import pytest
+from pecos.monitoring import ResultsIndex
 
 NoneType = type(None)
 
@@ -188,12 +189,7 @@ def plot_timeseries(data, tfilter=None, test_results_group=None, xaxis_min=None,
                         str(test_results_group2.index.values).strip('[]'), 30))
                 error_label = error_label + '\n' + warning_label
                 
-                date_idx2 = np.array([False]*len(data.index))
-                for row2 in range(len(test_results_group2.index)):
-                    s_index = test_results_group2.columns.get_loc("Start Time")
-                    e_index = test_results_group2.columns.get_loc("End Time")
-                    date_idx2 = date_idx2 + ((data.index >= test_results_group2.iloc[row2,s_index]) & 
-                                             (data.index <= test_results_group2.iloc[row2,e_index]))
+                date_idx2 = ResultsIndex(test_results_group2).contains(data.index)
                 
                 if sum(date_idx2) == 0:
                     continue
@@ -433,8 +429,9 @@ def plot_test_results(data, test_results, tfilter=None, image_format='png',
     data : pandas DataFrame
         Data, indexed by time (pm.data)
         
-    test_results : pandas DataFrame
-        Summary of the quality control test results (pm.test_results)
+    test_results : pandas DataFrame or CompactMask
+        Summary of the quality control test results (pm.test_results), or 
+        the compact mask (pm.compact_mask) which references the test results
     
     tfilter : pandas Series, optional
         Boolean values used to include time filter in the plot, default = None 
@@ -461,6 +458,10 @@ def plot_test_results(data, test_results, tfilter=None, image_format='png',
     ----------
     A list of file names
     """
+    if not isinstance(test_results, pd.DataFrame):
+        # CompactMask
+        test_results = test_results.test_results
+    
     if os.path.dirname(filename_root) == '':
         full_filename_root = os.path.join(os.getcwd(), filename_root)
     else:
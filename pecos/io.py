@@ -28,7 +28,8 @@ logger = logging.getLogger(__name__)
 
 env = Environment(loader=PackageLoader('pecos', 'templates'))
 
-def read_campbell_scientific(filename, index_col='TIMESTAMP', encoding=None):
+def read_campbell_scientific(filename, index_col='TIMESTAMP', encoding=None, 
+                             dtype='float64'):
     """
     Read Campbell Scientific CSV file.
 
@@ -43,11 +44,16 @@ def read_campbell_scientific(filename, index_col='TIMESTAMP', encoding=None):
     encoding : string, optional
         Character encoding (i.e. utf-16)
     
+    dtype : string, optional
+        Data type, default = 'float64'.  Use 'float32' to reduce memory.
+    
     Returns
     ---------
     pandas DataFrame
         Data
     """
+    assert np.dtype(dtype).kind == 'f', 'dtype must be a floating point data type'
+    
     logger.info("Reading Campbell Scientific CSV file " + filename)
 
     try:
@@ -58,7 +64,7 @@ def read_campbell_scientific(filename, index_col='TIMESTAMP', encoding=None):
         Unnamed = df.filter(regex='Unnamed')
         if Unnamed.columns.shape[0] > 0:
             df = df.drop(Unnamed.columns, 1)
-        df = pd.DataFrame(data = df.values, index = index, columns = df.columns, dtype='float64')
+        df = pd.DataFrame(data = df.values, index = index, columns = df.columns, dtype=dtype)
     except:
         logger.warning("Cannot extract database, CSV file reader failed " + filename)
         df = pd.DataFrame()
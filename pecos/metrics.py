@@ -5,6 +5,7 @@ analysis or compute quantities that might be of use in the analysis
 import pandas as pd
 import numpy as np
 import logging
+from pecos.monitoring import CompactMask
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +23,8 @@ def qci(mask, tfilter=None):
     
     Parameters
     ----------
-    mask : pandas DataFrame
-        Test results mask, returned from pm.mask
+    mask : pandas DataFrame or CompactMask
+        Test results mask, returned from pm.mask or pm.compact_mask
     
     tfilter : pandas Series, optional
         Time filter containing boolean values for each time index
@@ -34,6 +35,16 @@ def qci(mask, tfilter=None):
         Quality control index
     """
     
+    if isinstance(mask, CompactMask):
+        # Count the data points that passed from failure intervals
+        if tfilter is None:
+            nrows = mask.shape[0]
+        else:
+            nrows = int(tfilter.reindex(mask.index).fillna(False).astype(bool).sum())
+        qci = mask.sum(tfilter)/nrows
+        
+        return qci
+    
     if tfilter is not None:
         mask = mask[tfilter]
 
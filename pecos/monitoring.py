@@ -7,6 +7,8 @@ import pandas as pd
 import numpy as np
 import datetime
 import logging
+import warnings
+import concurrent.futures
 
 none_list = ['','none','None','NONE', None, [], {}]
 NoneType = type(None)
@@ -48,23 +50,1186 @@ def _documented_by(original, include_metadata=False):
         return target
     return wrapper
 
+def _get_positions(index, times, side='left'):
+    """
+    Convert times to integer positions in a monotonic DatetimeIndex using
+    searchsorted. Times are localized or converted to the index timezone.
+    """
+    times = pd.DatetimeIndex(pd.to_datetime(times))
+    if index.tz is not None:
+        if times.tz is None:
+            times = times.tz_localize(index.tz)
+        else:
+            times = times.tz_convert(index.tz)
+
+    return index.searchsorted(times, side=side)
+
+def _paint_intervals(start_row, stop_row, nrows):
+    """
+    Convert intervals of integer positions [start_row, stop_row) to a boolean
+    array (True = inside at least one interval) using a cumulative
+    difference array
+    """
+    counts = np.bincount(start_row, minlength=nrows+1) - \
+             np.bincount(stop_row, minlength=nrows+1)
+
+    return np.cumsum(counts[:nrows]) > 0
+
+def _find_blocks(failed, min_failures=1):
+    """
+    Find blocks of consecutive failures in each row of a 2D boolean array 
+    (columns, rows), True = failed.  Returns the column, start row and stop 
+    row (inclusive) of each block with at least min_failures timesteps, 
+    ordered by column and then start row.
+    """
+    ncols, nrows = failed.shape
+
+    # Pad each column with a passing value on both ends so that every block
+    # has a start (0 to 1) and a stop (1 to 0)
+    padded = np.zeros((ncols, nrows+2), dtype='int8')
+    padded[:, 1:-1] = failed
+    change = np.diff(padded, axis=1)
+
+    # Positions are found in the flattened array (faster than a 2D nonzero)
+    col, start_row = np.divmod(np.flatnonzero(change == 1), nrows+1)
+    stop_row = np.flatnonzero(change == -1) % (nrows+1) - 1
+
+    keep = (stop_row - start_row + 1) >= min_failures
+
+    return col[keep], start_row[keep], stop_row[keep]
+
+def _find_code_blocks(codes, min_failures=1):
+    """
+    Find blocks of consecutive equal codes in each row of a 2D integer 
+    array (columns, rows), 0 = passed.  Returns the column, start row, stop 
+    row (inclusive) and code of each block with at least min_failures 
+    timesteps, ordered by column and then start row.
+    """
+    ncols, nrows = codes.shape
+    
+    padded = np.zeros((ncols, nrows+2), dtype='int8')
+    padded[:, 1:-1] = codes
+    
+    # Each change in value ends the previous block (if the previous value 
+    # is not 0) and starts the next block (if the next value is not 0)
+    edge = np.flatnonzero(padded[:, 1:] != padded[:, :-1])
+    position = edge + edge//(nrows+1) # position of the value before the edge in padded
+    before = padded.ravel()[position]
+    after = padded.ravel()[position+1]
+    
+    col, start_row = np.divmod(edge[after != 0], nrows+1)
+    stop_row = edge[before != 0] % (nrows+1) - 1
+    code = after[after != 0]
+    
+    keep = (stop_row - start_row + 1) >= min_failures
+    
+    return col[keep], start_row[keep], stop_row[keep], code[keep]
+
+def _missing_steps(present, nsteps):
+    """
+    Runs of missing steps in 0 to nsteps-1, given the sorted unique steps 
+    that are present.  Returns the start and stop step (inclusive) of each 
+    run.
+    """
+    edges = np.concatenate([[-1], present, [nsteps]])
+    gap = np.diff(edges) > 1
+    
+    return edges[:-1][gap] + 1, edges[1:][gap] - 1
+
+def _on_step(index, origin, step, nsteps):
+    """
+    Boolean array, True if the timestamp is one of the nsteps expected 
+    times that start at origin with a step size of step (nanoseconds)
+    """
+    offset = (index - origin).values.astype('timedelta64[ns]').view('int64')
+    
+    return (offset % step == 0) & (offset >= 0) & (offset < nsteps*step)
+
+def _empty_test_results():
+    """
+    Empty test results DataFrame
+    """
+    test_results = pd.DataFrame(columns=['Variable Name', 'Start Time',
+                                         'End Time', 'Timesteps', 'Error Flag'])
+    test_results['Start Time'] = test_results['Start Time'].astype('datetime64[ns]')
+    test_results['End Time'] = test_results['End Time'].astype('datetime64[ns]')
+    test_results['Timesteps'] = test_results['Timesteps'].astype('int64')
+
+    return test_results
+
+def _to_object_array(values):
+    """
+    Convert a list to a 1D numpy array of objects (values can be tuples)
+    """
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+
+    return array
+
+class _TestResultsBuffer(object):
+    """
+    Append-only columnar storage for test results.  Start and end times are
+    stored as int64 nanoseconds (or the original index values if the index is
+    not a DatetimeIndex), timesteps are stored as int32, and the variable name
+    and error flag are stored as int32 codes into a list of categories.
+    """
+
+    def __init__(self):
+        self._categories = {'Variable Name': [], 'Error Flag': []}
+        self._codes = {'Variable Name': {}, 'Error Flag': {}}
+        self._chunks = []
+        self._nrows = 0
+
+    def __len__(self):
+        return self._nrows
+
+    def _encode(self, name, values, nrows):
+        """
+        Convert a single value or a tuple of (categories, codes) to codes
+        """
+        categories = self._categories[name]
+        codes = self._codes[name]
+
+        if isinstance(values, tuple):
+            local_categories, local_codes = values
+        else:
+            local_categories, local_codes = [values], np.zeros(nrows, dtype='int32')
+
+        mapping = np.empty(len(local_categories), dtype='int32')
+        for i, value in enumerate(local_categories):
+            if value not in codes:
+                codes[value] = len(categories)
+                categories.append(value)
+            mapping[i] = codes[value]
+
+        return mapping[local_codes]
+
+    def append(self, variable, start, end, timesteps, error_flag):
+        """
+        Append test results
+
+        Parameters
+        ----------
+        variable : single value or tuple
+            Variable name used for every row, or a tuple of
+            (list of variable names, int array of codes for each row)
+
+        start : pandas Index
+            Start time for each row
+
+        end : pandas Index
+            End time for each row
+
+        timesteps : numpy array of int
+            Number of timesteps for each row
+
+        error_flag : single value or tuple
+            Error flag used for every row, or a tuple of
+            (list of error flags, int array of codes for each row)
+        """
+        nrows = len(timesteps)
+        if nrows == 0:
+            return
+
+        chunk = {'Variable Name': self._encode('Variable Name', variable, nrows),
+                 'Timesteps': np.asarray(timesteps, dtype='int32'),
+                 'Error Flag': self._encode('Error Flag', error_flag, nrows)}
+
+        if isinstance(start, pd.DatetimeIndex):
+            chunk['tz'] = start.tz
+            chunk['Start Time'] = start.values.astype('datetime64[ns]').view('int64')
+            chunk['End Time'] = end.values.astype('datetime64[ns]').view('int64')
+        else:
+            chunk['tz'] = False # index values are not datetime
+            chunk['Start Time'] = np.asarray(start)
+            chunk['End Time'] = np.asarray(end)
+
+        self._chunks.append(chunk)
+        self._nrows = self._nrows + nrows
+
+    def extend(self, other, first_chunk=0, last_chunk=None):
+        """
+        Append chunks from another buffer
+        """
+        for chunk in other._chunks[first_chunk:last_chunk]:
+            chunk = dict(chunk)
+            for name in ['Variable Name', 'Error Flag']:
+                chunk[name] = self._encode(name, (other._categories[name], chunk[name]), None)
+            self._chunks.append(chunk)
+            self._nrows = self._nrows + len(chunk['Timesteps'])
+
+    def remove(self, start, stop):
+        """
+        Remove rows start to stop (not inclusive)
+        """
+        chunks = []
+        offset = 0
+        for chunk in self._chunks:
+            n = len(chunk['Timesteps'])
+            first = min(max(start - offset, 0), n)
+            last = min(max(stop - offset, 0), n)
+            if first == last:
+                chunks.append(chunk)
+            elif first > 0 or last < n:
+                chunk = dict(chunk)
+                for name in ['Variable Name', 'Start Time', 'End Time',
+                             'Timesteps', 'Error Flag']:
+                    chunk[name] = np.concatenate([chunk[name][:first], 
+                                                  chunk[name][last:]])
+                chunks.append(chunk)
+            offset = offset + n
+        self._chunks = chunks
+        self._nrows = self._nrows - (min(stop, self._nrows) - min(start, self._nrows))
+
+    def _times(self, chunks, name):
+        """
+        Combine start or end times from several chunks
+        """
+        tz = [chunk['tz'] for chunk in chunks]
+        values = [chunk[name] for chunk in chunks]
+
+        if all(t is not False for t in tz) and all(str(t) == str(tz[0]) for t in tz):
+            times = pd.DatetimeIndex(np.concatenate(values).view('datetime64[ns]'))
+            if tz[0] is not None:
+                times = times.tz_localize('UTC').tz_convert(tz[0])
+            return times
+        elif all(t is False for t in tz):
+            return np.concatenate(values)
+        else:
+            times = []
+            for t, value in zip(tz, values):
+                if t is False:
+                    times.append(_to_object_array(list(value)))
+                else:
+                    temp = pd.DatetimeIndex(value.view('datetime64[ns]'))
+                    if t is not None:
+                        temp = temp.tz_localize('UTC').tz_convert(t)
+                    times.append(temp.astype(object).values)
+            return np.concatenate(times)
+
+    def to_dataframe(self, first_row=0):
+        """
+        Build the test results DataFrame using rows starting at first_row
+        """
+        chunks = []
+        offset = 0
+        for chunk in self._chunks:
+            nrows = len(chunk['Timesteps'])
+            if offset + nrows > first_row:
+                if offset < first_row:
+                    chunk = dict(chunk)
+                    for name in ['Variable Name', 'Start Time', 'End Time',
+                                 'Timesteps', 'Error Flag']:
+                        chunk[name] = chunk[name][first_row-offset:]
+                chunks.append(chunk)
+            offset = offset + nrows
+
+        if len(chunks) == 0:
+            return _empty_test_results()
+
+        variable_names = _to_object_array(self._categories['Variable Name'])
+        error_flags = _to_object_array(self._categories['Error Flag'])
+
+        test_results = pd.DataFrame({
+            'Variable Name': variable_names[np.concatenate([c['Variable Name'] for c in chunks])],
+            'Start Time': self._times(chunks, 'Start Time'),
+            'End Time': self._times(chunks, 'End Time'),
+            'Timesteps': np.concatenate([c['Timesteps'] for c in chunks]).astype('int64'),
+            'Error Flag': error_flags[np.concatenate([c['Error Flag'] for c in chunks])]})
+
+        return test_results
+
+def _merge_intervals(start_row, stop_row):
+    """
+    Merge overlapping and adjacent intervals [start_row, stop_row), 
+    returns sorted intervals that do not overlap
+    """
+    if start_row.size == 0:
+        return start_row, stop_row
+
+    order = np.argsort(start_row, kind='stable')
+    start_row = start_row[order]
+    stop_row = np.maximum.accumulate(stop_row[order])
+
+    # A new interval starts where the start is after all previous stops
+    new = np.ones(start_row.size, dtype=bool)
+    new[1:] = start_row[1:] > stop_row[:-1]
+    last = np.append(np.flatnonzero(new)[1:] - 1, start_row.size - 1)
+
+    return start_row[new], stop_row[last]
+
+class CompactMask(object):
+    """
+    Compact boolean mask, stored as sorted failure intervals for each 
+    column instead of a boolean value for each data point.  The compact 
+    mask is returned by pm.compact_mask and can be used in place of pm.mask
+    in :class:`~pecos.metrics.qci` and :class:`~pecos.graphics.plot_test_results`.
+    
+    Parameters
+    ----------
+    index : pandas DatetimeIndex
+        Data index, must be monotonically increasing
+        
+    columns : pandas Index
+        Data column names, must be unique
+        
+    test_results : pandas DataFrame
+        Summary of the quality control test results (pm.test_results)
+    """
+
+    def __init__(self, index, columns, test_results):
+        assert index.is_monotonic_increasing, 'index must be monotonically increasing'
+        assert columns.is_unique, 'column names must be unique'
+
+        self.index = index
+        self.columns = columns
+        self.test_results = test_results
+        
+        # Failure intervals [start row, stop row) for each column position, 
+        # and intervals that apply to all columns (missing timestamps)
+        self._intervals = {}
+        self._rows = (np.array([], dtype='int64'), np.array([], dtype='int64'))
+        
+        if test_results.shape[0] == 0:
+            return
+        
+        start_row = _get_positions(index, test_results['Start Time'], 'left')
+        stop_row = _get_positions(index, test_results['End Time'], 'right')
+        col = columns.get_indexer(test_results['Variable Name'])
+
+        valid = start_row < stop_row
+
+        # Missing timestamps that are not associated with a column apply to 
+        # the entire row
+        missing = (test_results['Error Flag'] == 'Missing timestamp').values
+        rows = valid & (col == -1) & missing
+        self._rows = _merge_intervals(start_row[rows], stop_row[rows])
+
+        # Variable specific intervals
+        valid = valid & (col >= 0)
+        order = np.argsort(col[valid], kind='stable')
+        col = col[valid][order]
+        start_row = start_row[valid][order]
+        stop_row = stop_row[valid][order]
+        bounds = np.flatnonzero(np.diff(col)) + 1
+        for i, j in zip(np.append(0, bounds), np.append(bounds, col.size)):
+            if i < j:
+                self._intervals[col[i]] = _merge_intervals(start_row[i:j], stop_row[i:j])
+
+    @property
+    def shape(self):
+        """
+        Shape of the mask (number of rows, number of columns)
+        """
+        return (len(self.index), len(self.columns))
+
+    def intervals(self, column):
+        """
+        Failure intervals for a single column
+        
+        Parameters
+        ----------
+        column : str
+            Column name
+        
+        Returns
+        -------
+        tuple of numpy arrays
+            Start and stop row of each interval, rows start:stop failed at 
+            least one quality control test
+        """
+        icol = self.columns.get_loc(column)
+        if icol in self._intervals:
+            start_row, stop_row = self._intervals[icol]
+            return _merge_intervals(np.concatenate([start_row, self._rows[0]]), 
+                                    np.concatenate([stop_row, self._rows[1]]))
+        return self._rows
+
+    def __getitem__(self, columns):
+        """
+        Select columns, returns a CompactMask for a list of columns and a 
+        boolean Series for a single column
+        """
+        if not isinstance(columns, (list, pd.Index, np.ndarray)):
+            return self.to_dataframe([columns])[columns]
+
+        icols = self.columns.get_indexer(columns)
+        assert (icols >= 0).all(), 'columns must be in the mask'
+        
+        compact_mask = object.__new__(CompactMask)
+        compact_mask.index = self.index
+        compact_mask.columns = self.columns[icols]
+        compact_mask.test_results = self.test_results
+        compact_mask._rows = self._rows
+        compact_mask._intervals = {}
+        for i, icol in enumerate(icols):
+            if icol in self._intervals:
+                compact_mask._intervals[i] = self._intervals[icol]
+                
+        return compact_mask
+
+    def to_dataframe(self, columns=None):
+        """
+        Convert the compact mask to a boolean DataFrame, 
+        True = data point pass all tests, False = data point did not pass 
+        at least one test.
+        
+        Parameters
+        ----------
+        columns : list, optional
+            Columns included in the DataFrame. If not specified, all columns 
+            are included.
+        
+        Returns
+        -------
+        pandas DataFrame
+            Boolean mask
+        """
+        if columns is not None:
+            return self[list(columns)].to_dataframe()
+        
+        nrows, ncols = self.shape
+        
+        # Stored as (columns, rows) so each column is contiguous in memory
+        np_mask = np.ones((ncols, nrows), dtype=bool)
+        if self._rows[0].size > 0:
+            np_mask[:, _paint_intervals(self._rows[0], self._rows[1], nrows)] = False
+        for icol, (start_row, stop_row) in self._intervals.items():
+            np_mask[icol] &= ~_paint_intervals(start_row, stop_row, nrows)
+        
+        return pd.DataFrame(np_mask.T, index=self.index, columns=self.columns)
+
+    def apply(self, data):
+        """
+        Apply the mask to data, data that failed a quality control test are 
+        replaced by NaN.  Columns are cleaned one at a time, so the full 
+        boolean mask is not stored.
+        
+        Parameters
+        ----------
+        data : pandas DataFrame
+            Data, indexed by time (pm.data). The index must match the mask 
+            index.  Columns that are not in the mask are not modified.
+        
+        Returns
+        -------
+        pandas DataFrame
+            Cleaned data
+        """
+        assert data.index.equals(self.index), 'data.index must match the mask index'
+        
+        cleaned_data = data.copy()
+        nrows = len(self.index)
+        for column in self.columns:
+            if column not in cleaned_data.columns:
+                continue
+            start_row, stop_row = self.intervals(column)
+            if start_row.size > 0:
+                failed = _paint_intervals(start_row, stop_row, nrows)
+                cleaned_data[column] = cleaned_data[column].where(~failed)
+        
+        return cleaned_data
+
+    def sum(self, tfilter=None):
+        """
+        Number of data points that passed all tests in each column
+        
+        Parameters
+        ----------
+        tfilter : pandas Series, optional
+            Time filter containing boolean values for each time index, 
+            only data points where the time filter is True are counted
+        
+        Returns
+        -------
+        pandas Series
+            Number of data points that passed all tests
+        """
+        if tfilter is None:
+            active = np.arange(len(self.index) + 1)
+        else:
+            tfilter = tfilter.reindex(self.index).fillna(False).values.astype(bool)
+            active = np.append(0, np.cumsum(tfilter))
+        
+        counts = {}
+        for column in self.columns:
+            start_row, stop_row = self.intervals(column)
+            failed = (active[stop_row] - active[start_row]).sum()
+            counts[column] = active[-1] - failed
+        
+        return pd.Series(counts, index=self.columns, dtype='int64')
+
+class ResultsIndex(object):
+    """
+    Interval index over the test results.  Start and end times are stored 
+    as sorted arrays for each variable name, which are used to find test 
+    results that overlap a time interval or have a specific error flag 
+    without scanning every row.  The results index is returned by 
+    pm.results_index.
+    
+    Parameters
+    ----------
+    test_results : pandas DataFrame
+        Summary of the quality control test results (pm.test_results)
+    """
+
+    def __init__(self, test_results):
+        self.test_results = test_results
+        
+        start_time = test_results['Start Time']
+        self._datetime = pd.api.types.is_datetime64_any_dtype(start_time)
+        self._tz = start_time.dt.tz if self._datetime else None
+        
+        start = self._values(start_time)
+        end = self._values(test_results['End Time'])
+        flags, self._flags = pd.factorize(test_results['Error Flag'])
+        variables, self.variables = pd.factorize(test_results['Variable Name'])
+        
+        # Test results sorted by variable and start time, with the 
+        # running maximum end time for each variable
+        order = np.lexsort((start, variables))
+        variables = variables[order]
+        bounds = np.flatnonzero(np.diff(variables)) + 1
+        self._intervals = {}
+        for i, j in zip(np.append(0, bounds), np.append(bounds, variables.size)):
+            if i < j:
+                rows = order[i:j]
+                self._intervals[self.variables[variables[i]]] = (start[rows], 
+                    end[rows], rows, flags[rows])
+        
+        order = np.argsort(start, kind='stable')
+        self._all = (start[order], end[order], order, flags[order])
+
+    def _values(self, times):
+        # Times converted to int64 (nanoseconds, UTC if timezone aware)
+        if not self._datetime:
+            return np.asarray(times)
+        times = pd.DatetimeIndex(pd.to_datetime(times))
+        if self._tz is not None and times.tz is None:
+            times = times.tz_localize(self._tz)
+        
+        return times.values.astype('datetime64[ns]').view('int64')
+    
+    def _select(self, variable, error_flag):
+        # Start, end, and row of test results sorted by start time
+        if variable is None:
+            start, end, rows, flags = self._all
+        elif variable in self._intervals:
+            start, end, rows, flags = self._intervals[variable]
+        else:
+            return np.array([], dtype='int64'), np.array([], dtype='int64'), np.array([], dtype='int64')
+        
+        if error_flag is not None:
+            code = self._flags.get_indexer([error_flag])[0]
+            keep = flags == code
+            start, end, rows = start[keep], end[keep], rows[keep]
+        
+        return start, end, rows
+    
+    def overlapping(self, start_time, end_time, variable=None, error_flag=None):
+        """
+        Test results that overlap the interval [start_time, end_time]
+        
+        Parameters
+        ----------
+        start_time : Timestamp
+            Start time
+        
+        end_time : Timestamp
+            End time
+        
+        variable : str, optional
+            Variable name.  If not specified, all variables are used.
+        
+        error_flag : str, optional
+            Error flag.  If not specified, all error flags are used.
+        
+        Returns
+        -------
+        pandas DataFrame
+            Test results, in the same order as pm.test_results
+        """
+        start, end, rows = self._select(variable, error_flag)
+        if len(start) == 0:
+            return self.test_results.iloc[[]]
+        
+        t0, t1 = self._values([start_time, end_time])
+        
+        # Test results that start before t1, the running maximum end time 
+        # is used to skip test results that end before t0
+        stop = np.searchsorted(start, t1, side='right')
+        max_end = np.maximum.accumulate(end[:stop])
+        first = np.searchsorted(max_end, t0, side='left')
+        rows = rows[first + np.flatnonzero(end[first:stop] >= t0)]
+        
+        return self.test_results.iloc[np.sort(rows)]
+    
+    def error_flag(self, error_flag, variable=None):
+        """
+        Test results with an error flag
+        
+        Parameters
+        ----------
+        error_flag : str
+            Error flag
+        
+        variable : str, optional
+            Variable name.  If not specified, all variables are used.
+        
+        Returns
+        -------
+        pandas DataFrame
+            Test results, in the same order as pm.test_results
+        """
+        _, _, rows = self._select(variable, error_flag)
+        
+        return self.test_results.iloc[np.sort(rows)]
+    
+    def contains(self, index, variable=None, error_flag=None):
+        """
+        Indicates if each time in the index is within at least one test 
+        result
+        
+        Parameters
+        ----------
+        index : pandas DatetimeIndex
+            Times to check, the index does not need to be sorted
+        
+        variable : str, optional
+            Variable name.  If not specified, all variables are used.
+        
+        error_flag : str, optional
+            Error flag.  If not specified, all error flags are used.
+        
+        Returns
+        -------
+        numpy array
+            Boolean array, True if the time is within a test result
+        """
+        start, end, _ = self._select(variable, error_flag)
+        if len(start) == 0:
+            return np.zeros(len(index), dtype=bool)
+        
+        values = self._values(index)
+        max_end = np.maximum.accumulate(end)
+        last = np.searchsorted(start, values, side='right') - 1
+        
+        return (last >= 0) & (max_end[np.maximum(last, 0)] >= values)
+
+def _bounds_dict(bounds):
+    """
+    Dictionary of key: [lower bound, upper bound] from a dictionary or a 
+    DataFrame indexed by column name (the first column is the lower bound 
+    and the second column is the upper bound, NaN = no bound)
+    """
+    if isinstance(bounds, dict):
+        return bounds
+    
+    assert bounds.shape[1] == 2, 'bound DataFrame must have two columns (lower and upper bound)'
+    values = bounds.astype(object).where(bounds.notnull(), None)
+    for col in range(2):
+        if pd.api.types.is_float_dtype(bounds.dtypes.iloc[col]):
+            # Integer bounds are stored as float in a column with missing 
+            # bounds, integers are restored so error messages are the same 
+            # as using a dictionary
+            values.iloc[:, col] = [int(b) if b is not None and float(b).is_integer() 
+                                   else b for b in values.iloc[:, col]]
+    
+    return {key: list(value) for key, value in zip(values.index, values.values.tolist())}
+
+def _time_varying(bound):
+    """
+    True if the bound is a time-varying bound (pandas Series or DataFrame 
+    indexed by time)
+    """
+    return isinstance(bound, (pd.Series, pd.DataFrame))
+
+def _bound_str(bound):
+    """
+    Bound used in the error message, time-varying bounds use the name of 
+    the Series (if defined)
+    """
+    if not _time_varying(bound):
+        return str(bound)
+    elif isinstance(bound, pd.Series) and bound.name is not None:
+        return str(bound.name)
+    
+    return 'time-varying'
+
+def _compare(df, bound, op):
+    """
+    Compare df to a bound using op ('lt' or 'gt').  A time-varying bound is 
+    aligned to the index (and columns) of df and compared in a single 
+    operation.  Data compared to a missing (NaN) bound passes the test.
+    """
+    if isinstance(bound, pd.Series):
+        if not bound.index.equals(df.index):
+            bound = bound.reindex(df.index)
+        return getattr(df, op)(bound, axis=0)
+    elif isinstance(bound, pd.DataFrame):
+        if not (bound.index.equals(df.index) and bound.columns.equals(df.columns)):
+            bound = bound.reindex(index=df.index, columns=df.columns)
+        return getattr(df, op)(bound)
+    elif op == 'lt':
+        return df < bound
+    else:
+        return df > bound
+
+def _float_dtype(df):
+    """
+    Floating point data type used to store values from df in numpy arrays, 
+    float32 if every column is float32, otherwise float64
+    """
+    if df.shape[1] > 0 and (df.dtypes == np.float32).all():
+        return np.dtype('float32')
+    
+    return np.dtype('float64')
+
+def _rolling_delta(df, window_str):
+    """
+    Compute the difference between max and min values (delta) within a 
+    rolling window, the first window is set to NaN
+    """
+    min_df = df.rolling(window_str, min_periods=2, closed='both').min()
+    max_df = df.rolling(window_str, min_periods=2, closed='both').max()
+
+    diff_df = (max_df - min_df).astype(_float_dtype(df), copy=False)
+    diff_df.loc[diff_df.index[0]:diff_df.index[0]+pd.Timedelta(window_str),:] = None
+    
+    return diff_df
+
+def _range_arg(values, start_row, stop_row, func):
+    """
+    Position of the first min (func = np.less) or max (func = np.greater) 
+    value in values[start_row:stop_row+1] for each pair of start and stop 
+    rows, NaN values are skipped.  A sparse table of positions over windows 
+    of length 2**k is built once and each range is answered using two 
+    overlapping windows.
+    """
+    if func is np.less:
+        values = np.where(np.isnan(values), np.inf, values)
+    else:
+        values = np.where(np.isnan(values), -np.inf, values)
+    nrows = len(values)
+    length = stop_row - start_row + 1
+    level = np.floor(np.log2(length)).astype(int)
+    
+    # table[k][i] is the position of the min/max in values[i:i+2**k], 
+    # ties are resolved using the first position
+    table = [np.arange(nrows)]
+    for k in range(1, level.max()+1):
+        previous = table[-1]
+        first = previous[:nrows - 2**k + 1]
+        second = previous[2**(k-1):2**(k-1) + len(first)]
+        table.append(np.where(func(values[second], values[first]), second, first))
+    
+    positions = np.empty(len(start_row), dtype=int)
+    for k in np.unique(level):
+        rows = level == k
+        first = table[k][start_row[rows]]
+        second = table[k][stop_row[rows] - 2**k + 1]
+        positions[rows] = np.where(func(values[second], values[first]), second, first)
+    
+    return positions
+
+def _delta_mask(mask1, df, window_str, bound, direction):
+    """
+    While the mask flags data at the time at which the failure occurs, 
+    the actual timespan between the min and max should be flagged so that 
+    the final results include actual data points that caused the failure.
+    Spans are computed using integer positions for all failures in a column 
+    at once and painted using difference arrays.  Returns a mask DataFrame.
+    """
+    index = mask1.index
+    nrows = len(index)
+    failed = ~np.asarray(mask1.values, dtype=bool)
+    
+    # First row in the window that ends at each row
+    window_start = index.searchsorted(index - pd.Timedelta(window_str), side='left')
+    
+    mask2 = np.ones((len(mask1.columns), nrows), dtype=bool)
+    for icol, col in enumerate(mask1.columns):
+        stop_row = np.flatnonzero(failed[:, icol])
+        if stop_row.size == 0:
+            continue
+        start_row = window_start[stop_row]
+        
+        if (bound == 'lower') and (direction is None):
+            # set the entire time interval to False
+            mask2[icol] = ~_paint_intervals(start_row, stop_row + 1, nrows)
+            continue
+        
+        # extract the position of the min and max
+        values = np.asarray(df[col].values, dtype=float)
+        min_row = _range_arg(values, start_row, stop_row, np.less)
+        max_row = _range_arg(values, start_row, stop_row, np.greater)
+        
+        if bound == 'lower': # bound = lower, direction = positive or negative
+            # set the entire time interval to False
+            if direction == 'positive':
+                keep = min_row <= max_row
+            else:
+                keep = min_row >= max_row
+        
+        elif bound == 'upper': # bound = upper, direction = None, positive or negative
+            # set the time between max/min or min/max to False, or the 
+            # initially flagged location if the min and max are the same
+            keep = min_row == max_row
+            if direction != 'negative':
+                keep = keep | (min_row < max_row)
+            if direction != 'positive':
+                keep = keep | (min_row > max_row)
+            same = min_row == max_row
+            start_row = np.where(same, stop_row, np.minimum(min_row, max_row))
+            stop_row = np.where(same, stop_row, np.maximum(min_row, max_row))
+        
+        mask2[icol] = ~_paint_intervals(start_row[keep], stop_row[keep] + 1, nrows)
+    
+    mask2 = pd.DataFrame(mask2.T, columns=mask1.columns, index=mask1.index)
+    return mask2
+
+def _normalize(df, window):
+    """
+    Normalize data using (data-mean)/std, within a rolling window if 
+    window (in seconds) is not None
+    """
+    if window is not None:
+        window_str = str(int(window*1e3)) + 'ms' # milliseconds
+        df_mean = df.rolling(window_str, min_periods=2, closed='both').mean()
+        df_std = df.rolling(window_str, min_periods=2, closed='both').std()
+        df = ((df - df_mean)/df_std).astype(_float_dtype(df), copy=False)
+    else:
+        df = (df - df.mean())/df.std()
+    
+    df = df.replace([np.inf, -np.inf], np.nan)
+    
+    return df
+
+def _window_start(index, history_window, first_row):
+    """
+    Start of the history window for each row (starting at first_row), the 
+    row nearest to t-window.  If the distance to the previous and next 
+    timestamp is the same, the next timestamp is used (the same as 
+    index.get_indexer(method='nearest')).
+    """
+    nrows = len(index)
+    target = index[first_row:] - history_window
+    window_start = np.zeros(nrows, dtype=int)
+    if index.is_monotonic_increasing and index.is_unique:
+        index_values = index.asi8
+        target_values = target.asi8
+        right = index.searchsorted(target, side='left')
+        left = index.searchsorted(target, side='right') - 1
+        right_values = index_values[np.minimum(right, nrows-1)]
+        use_left = (np.abs(target_values - index_values[left]) < np.abs(right_values - target_values)) | (right == nrows)
+        window_start[first_row:] = np.where(use_left, left, right)
+    else:
+        window_start[first_row:] = index.get_indexer(target, method='nearest')
+    
+    return window_start
+
+class StreamingHistory(object):
+    """
+    Cleaned history used by the streaming quality control tests, stored 
+    in a fixed size ring buffer.
+    
+    The ring buffer holds the timestamps and cleaned data in the most 
+    recent history window.  Rows are discarded once they leave the window, 
+    so memory use does not depend on the length of the data.  Passing the 
+    same StreamingHistory to consecutive calls of check_custom_streaming or 
+    check_outlier (streaming=True) continues the analysis from the end of 
+    the previous call, which allows a live data feed to be analyzed in 
+    chunks.  A StreamingHistory should only be used with one quality 
+    control test.
+    
+    Parameters
+    ----------
+    capacity : int, optional
+        Number of rows stored in the ring buffer.  If not specified, the 
+        capacity is set using the first data set.  The buffer is enlarged 
+        if the history window contains more rows than the capacity.  
+        Values are stored as float32 if every column of the first data set 
+        is float32, otherwise float64.
+    """
+
+    def __init__(self, capacity=None):
+        assert isinstance(capacity, (NoneType, int)), 'capacity must be None or of type int'
+        
+        self.capacity = capacity
+        self.columns = None
+        # Each row is stored twice (at position p and p+capacity) so that 
+        # any window of rows is a contiguous slice of the buffer
+        self._values = None
+        self._timestamps = None
+        self._tz = None
+        self._first = 0 # row number of the oldest row in the buffer
+        self._stop = 0 # row number after the newest row in the buffer
+        self._restored = None # row and columns restored by rebase
+    
+    def __len__(self):
+        return self._stop - self._first
+    
+    @property
+    def data(self):
+        """
+        Cleaned history stored in the ring buffer (pandas DataFrame)
+        """
+        if self._values is None:
+            return pd.DataFrame()
+        
+        index = pd.DatetimeIndex(self._rows(self._first, self._stop, self._timestamps))
+        if self._tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self._tz)
+        
+        return pd.DataFrame(self._rows(self._first, self._stop).copy(), 
+                            index=index, columns=self.columns)
+    
+    def _rows(self, start, stop, values=None):
+        # Rows [start, stop), as a view of the buffer
+        if values is None:
+            values = self._values
+        pos = start % self.capacity
+        return values[pos:pos+stop-start]
+    
+    def _view(self, start, stop):
+        # Read only view of rows [start, stop)
+        view = self._rows(start, stop)
+        view.flags.writeable = False
+        return view
+    
+    def _row(self, row):
+        return self._values[row % self.capacity]
+    
+    def _set(self, row, columns, values):
+        pos = row % self.capacity
+        self._values[pos, columns] = values
+        self._values[pos+self.capacity, columns] = values
+    
+    def _allocate(self, capacity, ncols, dtype, values_dtype):
+        if self._values is not None:
+            values = self._rows(self._first, self._stop).copy()
+            timestamps = self._rows(self._first, self._stop, self._timestamps).copy()
+            logger.info("Increase streaming history capacity to " + str(capacity) + " rows")
+        
+        self.capacity = capacity
+        self._values = np.empty((2*capacity, ncols), dtype=values_dtype)
+        self._timestamps = np.empty(2*capacity, dtype=dtype)
+        
+        if len(self) > 0:
+            self._stop = self._first
+            self._push(timestamps, values)
+    
+    def _push(self, timestamps, values):
+        nrows = len(values)
+        if len(self) + nrows > self.capacity:
+            self._allocate(max(2*self.capacity, len(self) + nrows), 
+                           values.shape[1], self._timestamps.dtype, 
+                           self._values.dtype)
+        
+        pos = (self._stop + np.arange(nrows)) % self.capacity
+        for offset in [0, self.capacity]:
+            self._values[pos+offset] = values
+            self._timestamps[pos+offset] = timestamps
+        self._stop = self._stop + nrows
+    
+    def _prepare(self, df, history_window, extra_rows=1):
+        """
+        Setup the buffer for new data.  Returns the first data row that is 
+        tested, the row number of each data row, the start of the history 
+        window for each data row (row number), and the first row that must 
+        be kept in the buffer for each data row.
+        """
+        nhist = len(self)
+        if self.columns is not None:
+            assert list(df.columns) == list(self.columns), 'data columns must match the columns in the history'
+        
+        # The first data rows are used as history if the buffer is empty
+        if nhist == 0:
+            ti = df.index.get_loc(df.index[0]+history_window)
+            index = df.index
+        else:
+            ti = 0
+            index = pd.DatetimeIndex(np.concatenate([
+                self._rows(self._first, self._stop, self._timestamps), 
+                df.index.values]))
+        
+        rows = self._stop + np.arange(df.shape[0])
+        window_start = _window_start(index, history_window, nhist+ti)[nhist:] + self._first
+        window_start[:ti] = rows[:ti]
+        keep_from = np.minimum.accumulate(window_start[::-1])[::-1]
+        
+        # Rows in the buffer are discarded one timestamp late
+        keep_prev = np.concatenate([keep_from[ti:ti+1], keep_from[ti:-1]])
+        capacity = int(np.max(rows[ti:] + extra_rows - keep_prev, initial=1))
+        if self._values is None:
+            self.columns = df.columns
+            self._tz = getattr(df.index, 'tz', None)
+            self._allocate(max(self.capacity or 0, capacity), df.shape[1], 
+                           df.index.values.dtype, _float_dtype(df))
+        elif capacity > self.capacity:
+            self._allocate(capacity, df.shape[1], self._timestamps.dtype, 
+                           self._values.dtype)
+        
+        return ti, rows, window_start, keep_from
+    
+    def _update(self, timestamps, values, first_row, stop, keep):
+        """
+        Discard rows before row number keep and add data rows up to row 
+        number stop (first_row is the row number of the first data row)
+        """
+        self._first = max(self._first, min(keep, self._stop))
+        if self._stop < keep:
+            self._first = self._stop = keep
+        
+        start = self._stop - first_row
+        stop = stop - first_row
+        if stop > start:
+            self._push(timestamps[start:stop], values[start:stop])
+
+def _streaming_outlier(history, df, history_window, bound, absolute_value, rebase):
+    """
+    Streaming outlier test, data is normalized using the mean and standard 
+    deviation of the cleaned history.  Running sums of the history are 
+    updated as rows enter and leave the window, or are removed when they 
+    fail the test, so the cost of each timestamp does not depend on the 
+    window size.  Returns the mask as a numpy array (True = pass).
+    """
+    raw_data = df.values.astype(_float_dtype(df))
+    timestamps = df.index.values
+    nrows, ncols = raw_data.shape
+    np_mask = np.ones((nrows, ncols), dtype=bool)
+    
+    ti, rows, window_start, keep_from = history._prepare(df, history_window)
+    if ti >= nrows:
+        return np_mask
+    
+    # Values are shifted to reduce round off error in the running sums
+    history._update(timestamps, raw_data, rows[0], rows[ti]+1, window_start[ti])
+    shift = np.nanmean(history._rows(window_start[ti], rows[ti]+1), axis=0, 
+                       dtype='float64')
+    shift[np.isnan(shift)] = 0
+    
+    count = np.zeros(ncols) # number of values in the history (not NaN)
+    sum1 = np.zeros(ncols)
+    sum2 = np.zeros(ncols)
+    
+    def update(row, sign):
+        values = history._row(row) - shift
+        valid = ~np.isnan(values)
+        values = np.where(valid, values, 0)
+        return (count + sign*valid, sum1 + sign*values, sum2 + sign*values**2)
+    
+    history_start = window_start[ti]
+    history_stop = history_start
+    restored = history._restored # row and columns restored by rebase at the previous timestamp
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for t in range(ti, nrows):
+            row = rows[t]
+            t_start = window_start[t]
+            history._update(timestamps, raw_data, rows[0], row+1, 
+                            min(keep_from[t], history_start))
+            
+            # Update the history to rows [t_start, row)
+            for r in range(history_stop, row):
+                count, sum1, sum2 = update(r, 1)
+            for r in range(history_start, t_start):
+                count, sum1, sum2 = update(r, -1)
+            history_start, history_stop = t_start, row
+            
+            mean = sum1/count
+            var = (sum2 - sum1*mean)/(count - 1)
+            var[count < 2] = np.nan
+            
+            # Recompute the variance directly if the running sums are 
+            # dominated by round off error (e.g. stagnant data)
+            check = (var <= 1e-10*sum2/count) & (count >= 2)
+            if check.any():
+                values = history._rows(t_start, row)[:, check]
+                var[check] = np.nanvar(values, axis=0, ddof=1, dtype='float64')
+                mean[check] = np.nanmean(values, axis=0, dtype='float64') - shift[check]
+            
+            zt = (history._row(row) - shift - mean)/np.sqrt(np.maximum(var, 0))
+            zt[np.isinf(zt)] = np.nan
+            
+            # True = pass, False = fail
+            if absolute_value:
+                zt = np.abs(zt)
+            
+            mask_t = np.ones(ncols, dtype=bool)
+            if bound[0] not in none_list:
+                mask_t = mask_t & (zt >= bound[0])
+            if bound[1] not in none_list:
+                mask_t = mask_t & (zt <= bound[1])
+            
+            # Anomalous data is removed from the history
+            np_mask[t] = mask_t
+            history._set(row, ~mask_t, np.nan)
+            if restored is not None:
+                r, columns = restored
+                in_history = history_start <= r < history_stop
+                if in_history:
+                    count, sum1, sum2 = update(r, -1)
+                if r >= history._first:
+                    history._set(r, columns, np.nan)
+                if in_history:
+                    count, sum1, sum2 = update(r, 1)
+                restored = None
+            
+            # rebase
+            nan_count = (row - t_start - count) + np.isnan(history._row(row))
+            check_rebase = nan_count/(row + 1 - t_start) > rebase
+            if check_rebase.any():
+                history._set(row, check_rebase, raw_data[t][check_rebase])
+                # Restored values are removed from the history after the 
+                # next timestamp is analyzed
+                restored = (row, check_rebase & ~np_mask[t])
+    
+    history._restored = restored
+    
+    return np_mask
+
 ### Object-oriented approach
 class PerformanceMonitoring(object):
 
-    def __init__(self):
+    def __init__(self, dtype=None):
         """
         PerformanceMonitoring class
+        
+        Parameters
+        ----------
+        dtype : str or numpy dtype, optional
+            Data type used to store floating point data (e.g. 'float32'). 
+            Rolling statistics and streaming statistics are accumulated in 
+            float64.  If not specified, data types are not changed.
         """
+        assert dtype is None or np.dtype(dtype).kind == 'f', 'dtype must be None or a floating point data type'
+        
         self.df = pd.DataFrame()
+        self.dtype = dtype
         self.trans = {}
         self.tfilter = pd.Series(dtype='float64')
-        self.test_results = pd.DataFrame(columns=['Variable Name',
-                                                'Start Time', 'End Time',
-                                                'Timesteps', 'Error Flag'])
-        self.test_results['Start Time'] = self.test_results['Start Time'].astype('datetime64[ns]')
-        self.test_results['End Time'] = self.test_results['End Time'].astype('datetime64[ns]')
-        self.test_results['Timesteps'] = self.test_results['Timesteps'].astype('int64')
+        self._compress_tfilter = False # evaluate checks on time filter rows only
+        
+        # Test results are appended to a columnar buffer, the test results 
+        # DataFrame is built when pm.test_results is accessed
+        self._test_results_buffer = _TestResultsBuffer()
+        self._test_results = _empty_test_results()
+        self._test_results_nrows = 0 # number of rows from the buffer in self._test_results
+        self._test_results_first = 0 # first row from the buffer in self._test_results
         
+        # The mask and cleaned data are cached until the data, time filter or
+        # test results change
+        self._version = 0
+        self._cache = {}
+        
+        # Quality control plans run incrementally (see QCPlan.run_incremental)
+        self._plan_states = {}
+        
+        # Expected times (start time, step, number of steps) for columns 
+        # checked with their own frequency in check_timestamp
+        self._native_timestamps = {}
 
     @property
     def data(self):
@@ -73,45 +1238,192 @@ class PerformanceMonitoring(object):
         object using ``add_dataframe``.
         """
         return self.df
+
+    @property
+    def test_results(self):
+        """
+        Summary of the quality control test results, each row includes the 
+        variable name, start time, end time, number of timesteps, and 
+        error flag.
+        """
+        nrows = len(self._test_results_buffer)
+        if self._test_results_nrows < nrows:
+            test_results = self._test_results_buffer.to_dataframe(self._test_results_nrows)
+            if self._test_results.shape[0] == 0:
+                self._test_results = test_results
+            else:
+                self._test_results = pd.concat([self._test_results, test_results],
+                                               ignore_index=True)
+            self._test_results_nrows = nrows
+
+        return self._test_results
+
+    @test_results.setter
+    def test_results(self, test_results):
+        self._test_results = test_results
+        self._test_results_nrows = len(self._test_results_buffer)
+        self._test_results_first = self._test_results_nrows
+        self._update_version()
     
+    def _remove_test_results(self, start, stop):
+        """
+        Remove test results appended to the buffer in rows start to stop 
+        (not inclusive), rows appended after stop are kept
+        """
+        if stop <= start:
+            return
+        
+        # Rows from the buffer that are in the test results DataFrame
+        first = self._test_results_first
+        nrows = self._test_results_nrows
+        if max(start, first) < min(stop, nrows):
+            offset = self._test_results.shape[0] - (nrows - first)
+            keep = np.ones(self._test_results.shape[0], dtype=bool)
+            keep[offset+max(start, first)-first:offset+min(stop, nrows)-first] = False
+            self._test_results = self._test_results[keep].reset_index(drop=True)
+        self._test_results_first = first - max(min(stop, first) - start, 0)
+        self._test_results_nrows = nrows - max(min(stop, nrows) - start, 0)
+        
+        self._test_results_buffer.remove(start, stop)
+        
+        # Provisional test results from other plans are shifted
+        for state in self._plan_states.values():
+            if state.provisional_rows is not None and state.provisional_rows[0] >= stop:
+                state.provisional_rows = (state.provisional_rows[0] - (stop - start), 
+                                          state.provisional_rows[1] - (stop - start))
+        self._update_version()
+
     @property
     def mask(self):
         """
         Boolean mask indicating if data that failed a quality control test. 
         True = data point pass all tests, False = data point did not pass at least one test.
+        The mask is cached until the data or test results change (including 
+        changes made in place), make a copy before modifying the mask.
         """
         if self.df.empty:
             logger.info("Empty database")
             return
 
-        # True = pass, False = fail
-        mask = pd.DataFrame(True, index=self.df.index, columns=self.df.columns)
+        mask = self._get_cache('mask')
+        if mask is None:
+            mask = self._set_cache('mask', self._compute_mask())
 
-        for i in self.test_results.index:
-            variable = self.test_results.loc[i, 'Variable Name']
-            start_date = self.test_results.loc[i, 'Start Time']
-            end_date = self.test_results.loc[i, 'End Time']
-            if variable in mask.columns:
-                try:
-                    mask.loc[start_date:end_date,variable] = False
-                except:
-                    pass
-            elif self.test_results.loc[i, 'Error Flag'] == 'Missing timestamp':
-                mask.loc[start_date:end_date,:] = False
-                
         return mask
 
     @property
     def cleaned_data(self):
         """
         Cleaned data set, data that failed a quality control test are replaced by NaN.
+        The cleaned data is computed from the cached mask each time it is 
+        accessed, so changes made to the data in place are included.
         """
         return self.df[self.mask]
-    
 
-    def _setup_data(self, key):
+    @property
+    def compact_mask(self):
         """
-        Setup data to use in the quality control test
+        Compact mask, stored as sorted failure intervals for each column 
+        (see :class:`~pecos.monitoring.CompactMask`).  The compact mask can 
+        be used in place of the mask on data sets that are too large to store 
+        the boolean mask.
+        """
+        if self.df.empty:
+            logger.info("Empty database")
+            return
+
+        compact_mask = self._get_cache('compact_mask')
+        if compact_mask is None:
+            compact_mask = self._set_cache('compact_mask', 
+                CompactMask(self.df.index, self.df.columns, self.test_results))
+
+        return compact_mask
+
+    @property
+    def results_index(self):
+        """
+        Interval index over the test results (see 
+        :class:`~pecos.monitoring.ResultsIndex`), used to find test results 
+        that overlap a time interval or have a specific error flag.
+        """
+        results_index = self._get_cache('results_index')
+        if results_index is None:
+            results_index = self._set_cache('results_index', 
+                                            ResultsIndex(self.test_results))
+
+        return results_index
+
+    def _update_version(self):
+        """
+        Invalidate the cached mask and cleaned data, called each time the
+        data, time filter or test results change
+        """
+        self._version = self._version + 1
+        self._cache = {}
+
+    def _cache_key(self):
+        """
+        Values that are derived from the test results (mask, compact mask 
+        and results index) depend on the test results and the data index 
+        and columns.  Data that is replaced directly (e.g. pm.df = ...) and 
+        test results that are edited in place also invalidate the cache.
+        """
+        test_results_hash = pd.util.hash_pandas_object(self.test_results).values
+        
+        return (self._version, self.df, self.df.index, self.df.columns, 
+                test_results_hash)
+
+    def _get_cache(self, name):
+        """
+        Return a cached value, or None if the cached value is out of date
+        """
+        if name not in self._cache:
+            return None
+        key, value = self._cache[name]
+        version, df, index, columns, test_results_hash = self._cache_key()
+        if (key[0] == version) and (key[1] is df) and (key[2] is index) and \
+                (key[3] is columns) and np.array_equal(key[4], test_results_hash):
+            return value
+
+    def _set_cache(self, name, value):
+        self._cache[name] = (self._cache_key(), value)
+
+        return value
+
+    def _compute_mask(self):
+        """
+        Compute the mask from test results
+        """
+        if self.df.index.is_monotonic_increasing and self.df.columns.is_unique:
+            return self._generate_mask()
+        
+        # Intervals can not be converted to integer positions if the index 
+        # is not monotonic (or columns are not unique), intervals are added 
+        # one variable at a time
+        
+        # True = pass, False = fail
+        mask = pd.DataFrame(True, index=self.df.index, columns=self.df.columns)
+
+        results_index = self.results_index
+        for variable in results_index.variables:
+            if variable in mask.columns:
+                mask.loc[results_index.contains(mask.index, variable), variable] = False
+            else:
+                rows = results_index.contains(mask.index, variable, 'Missing timestamp')
+                mask.loc[rows, :] = False
+                
+        return mask
+
+    def _generate_mask(self):
+        """
+        Generate the mask from test results using the compact mask
+        """
+        return self.compact_mask.to_dataframe()
+
+    def _setup_data(self, key, copy=False):
+        """
+        Setup data to use in the quality control test.  If key is None and 
+        copy is False, the data is not copied and should not be modified.
         """
         if self.df.empty:
             logger.info("Empty database")
@@ -124,30 +1436,244 @@ class PerformanceMonitoring(object):
             except:
                 logger.warning("Undefined key: " + key)
                 return
-        else:
+        elif copy:
             df = self.df.copy()
+        else:
+            df = self.df
 
         return df
 
-    def _generate_test_results(self, df, bound, min_failures, error_prefix):
+    def _active_rows(self):
         """
-        Compare DataFrame to bounds to generate a True/False mask where
-        True = passed, False = failed.  Append results to test_results.
+        Row positions where the time filter is True, used to compress the 
+        data before running a quality control test.  Returns None if the 
+        test should use all rows.
         """
+        if not self._compress_tfilter or self.tfilter.empty or \
+                not self.tfilter.index.equals(self.df.index):
+            return None
+        
+        return np.flatnonzero(np.asarray(self.tfilter.values, dtype=bool))
+
+    def _generate_test_results(self, df, bound, min_failures, error_prefix, 
+                               rows=None):
+        """
+        Compare DataFrame to bounds and append results to test_results.  
+        If rows is not None, df only includes rows (row positions in self.df).
+        Bounds can be time-varying (pandas Series or DataFrame indexed by time).
+        
+        Lower and upper bound failures are stored in a single array of 
+        codes (0 = passed, 1 = below the lower bound, 2 = above the upper 
+        bound) and blocks for both bounds are extracted at once.
+        """
+        tested = [_time_varying(b) or b not in none_list for b in bound]
+        if not any(tested):
+            return
+        self._update_version()
         
+        # Values and codes are (columns, rows), the layout used by pandas 
+        # to store a DataFrame with one data type
+        values = df.values.T
+        ncols, nrows = values.shape
+        codes = np.zeros((ncols, nrows), dtype='int8')
+        error_msgs = []
+        for code, op, error_msg in [(1, 'lt', ' < lower bound, '), 
+                                    (2, 'gt', ' > upper bound, ')]:
+            b = bound[code-1]
+            error_msgs.append(error_prefix+error_msg+_bound_str(b))
+            if not tested[code-1]:
+                continue
+            if not _time_varying(b) and values.dtype.kind == 'f':
+                failed = getattr(np, {'lt': 'less', 'gt': 'greater'}[op])(values, b)
+            else:
+                failed = np.asarray(_compare(df, b, op).values, dtype=bool).T
+            np.add(codes, code, out=codes, where=failed)
+        
+        if rows is None and not self.tfilter.empty:
+            tfilter = self.tfilter
+            if not tfilter.index.equals(df.index):
+                # df only includes a subset of rows (e.g. data from 
+                # a time slice)
+                tfilter = tfilter.reindex(df.index, fill_value=True)
+            codes[:, ~np.asarray(tfilter.values, dtype=bool)] = 0
+        
+        index = df.index if rows is None else None
+        variable = (list(df.columns), np.tile(np.arange(ncols), 2))
+        error_flag = (error_msgs, np.repeat([0, 1], ncols))
+        if all(tested) and (codes == 3).any():
+            # Data is both below the lower bound and above the upper bound 
+            # (lower bound > upper bound), lower and upper bound failures 
+            # are extracted separately
+            for code in [1, 2]:
+                failed = (codes & code) != 0
+                self._append_blocks(failed, variable, (error_msgs[code-1:code], 
+                                    np.zeros(ncols, dtype=int)), min_failures, 
+                                    rows, index)
+            return
+        
+        self._append_blocks(codes, variable, error_flag, min_failures, 
+                            rows, index)
+
+    def _increment_data(self, df, increment, absolute_value, rows):
+        """
+        Difference between values increment rows apart.  If rows is not None, 
+        the difference is only computed for rows (row positions in self.df).
+        Returns the difference and the rows that were evaluated.
+        """
+        if rows is not None:
+            # Rows without a previous value (increment rows before) pass 
+            # the test
+            rows = rows[rows >= increment]
+            prev = df.take(rows - increment)
+            df = df.take(rows)
+            prev.index = df.index
+            df = df - prev
+        elif increment > 0 and df.shape[1] > 0 and \
+                ((df.dtypes == np.float64).all() or (df.dtypes == np.float32).all()):
+            # Same as df.diff, computed on a single array instead of one 
+            # block at a time
+            values = df.values
+            diff = np.empty_like(values)
+            diff[:increment] = np.nan
+            np.subtract(values[increment:], values[:-increment], 
+                        out=diff[increment:])
+            if absolute_value:
+                np.abs(diff, out=diff)
+            return pd.DataFrame(diff, index=df.index, columns=df.columns), rows
+        else:
+            df = df.diff(periods=increment)
+        
+        if absolute_value:
+            df = np.abs(df)
+        
+        return df, rows
+
+    def _bounds_test_results(self, bounds, min_failures, error_prefix, 
+                             increment=None, absolute_value=True):
+        """
+        Compare data to a bound for each translation dictionary key 
+        (dictionary of key: bound).  All columns are compared to vectors of 
+        lower and upper bounds at once, test results are the same (and in 
+        the same order) as comparing each key separately.
+        """
+        if self.df.empty:
+            logger.info("Empty database")
+            return
+        
+        # Columns used by each key
+        groups = []
+        columns = []
+        position = {}
+        for key, bound in bounds.items():
+            assert isinstance(bound, list), 'bound must be of type list'
+            assert not any(_time_varying(b) for b in bound), 'time-varying bounds must be tested one key at a time'
+            try:
+                cols = list(self.trans[key])
+                assert self.df.columns.get_indexer(cols).min(initial=0) >= 0
+            except:
+                logger.warning("Undefined key: " + str(key))
+                continue
+            for col in cols:
+                if col not in position:
+                    position[col] = len(columns)
+                    columns.append(col)
+            groups.append((key, [position[col] for col in cols], bound))
+        
+        if len(columns) == len(self.df.columns) and \
+                self.df.columns.equals(pd.Index(columns)):
+            df = self.df
+        else:
+            df = self.df[columns]
+        
+        rows = self._active_rows()
+        if increment is not None:
+            null = df.isnull().all().values
+            for key, cols, bound in groups:
+                if null[cols].all():
+                    logger.warning("Check increment range failed (all data is Null): " + str(key))
+            groups = [group for group in groups if not null[group[1]].all()]
+            df, rows = self._increment_data(df, increment, absolute_value, rows)
+            values = df.values
+        else:
+            if rows is not None:
+                df = df.take(rows)
+            values = df.values
+        
+        # Bounds are compared using the data type of floating point data
+        dtype = values.dtype if values.dtype.kind == 'f' else np.dtype('float64')
+        
+        # Each entry is a column compared to a lower or upper bound, ordered 
+        # by key and then lower/upper bound
+        names, error_msgs, entry_msgs = [], [], []
+        entries = {0: ([], [], []), 1: ([], [], [])} # (entry, column, bound)
+        for key, cols, bound in groups:
+            for side, error_msg in [(0, error_prefix+' < lower bound, '), 
+                                    (1, error_prefix+' > upper bound, ')]:
+                if bound[side] in none_list:
+                    continue
+                error_msgs.append(error_msg+str(bound[side]))
+                for col in cols:
+                    entries[side][0].append(len(names))
+                    entries[side][1].append(col)
+                    entries[side][2].append(bound[side])
+                    names.append(columns[col])
+                    entry_msgs.append(len(error_msgs)-1)
+        
+        self._update_version()
+        if len(names) == 0:
+            return
+        
+        failed = np.empty((len(names), values.shape[0]), dtype=bool)
+        for side, func in [(0, np.less), (1, np.greater)]:
+            entry, cols, bound = entries[side]
+            if len(entry) == 0:
+                continue
+            cols = np.array(cols)
+            bound = np.array(bound, dtype=dtype)
+            if np.array_equal(cols, np.arange(values.shape[1])):
+                failed[entry] = func(values, bound).T
+            else:
+                failed[entry] = func(values[:, cols], bound).T
+        
+        if rows is None and not self.tfilter.empty:
+            tfilter = self.tfilter.reindex(self.df.index, fill_value=True)
+            failed[:, ~np.asarray(tfilter.values, dtype=bool)] = False
+        
+        self._append_blocks(failed, (names, np.arange(len(names))), 
+                            (error_msgs, np.array(entry_msgs)), min_failures, rows)
+
+    def _delta_test_results(self, df, diff_df, bound, window_str, direction, 
+                            min_failures):
+        """
+        Compare delta (max-min) to bounds and append results to test_results
+        """
+        if direction == 'positive':
+            error_prefix = 'Delta (+)'
+        elif direction == 'negative':
+            error_prefix = 'Delta (-)'
+        else:
+            error_prefix = 'Delta'
+
         # Lower Bound
         if bound[0] not in none_list:
-            mask = ~(df < bound[0]) # True = passed test
+            mask = ~(diff_df < bound[0])
             error_msg = error_prefix+' < lower bound, '+str(bound[0])
+            if not self.tfilter.empty:
+                mask[~self.tfilter] = True
+            mask = _delta_mask(mask, df, window_str, 'lower', direction) 
             self._append_test_results(mask, error_msg, min_failures)
 
         # Upper Bound
         if bound[1] not in none_list:
-            mask = ~(df > bound[1]) # True = passed test
+            mask = ~(diff_df > bound[1])
             error_msg = error_prefix+' > upper bound, '+str(bound[1])
+            if not self.tfilter.empty:
+                mask[~self.tfilter] = True
+            mask = _delta_mask(mask, df, window_str, 'upper', direction) 
             self._append_test_results(mask, error_msg, min_failures)
 
-    def _append_test_results(self, mask, error_msg, min_failures=1, timestamp_test=False):
+    def _append_test_results(self, mask, error_msg, min_failures=1, timestamp_test=False,
+                             rows=None):
         """
         Append QC results to the PerformanceMonitoring object.
 
@@ -166,58 +1692,103 @@ class PerformanceMonitoring(object):
         timestamp_test : boolean, optional
             When True, the mask comes from a timestamp test, and the variable 
             name should not be included in the test results
+        
+        rows : numpy array, optional
+            Row positions of the mask in self.df, used when the mask only 
+            includes rows where the time filter is True
+        """
+        self._update_version()
+        
+        if rows is not None:
+            failed = ~np.asarray(mask.values, dtype=bool).T
+            entries = np.arange(failed.shape[0])
+            self._append_blocks(failed, (list(mask.columns), entries), 
+                                ([error_msg], np.zeros_like(entries)), 
+                                min_failures, rows)
+            return
+
+        if not self.tfilter.empty:
+            tfilter = self.tfilter
+            if len(tfilter) != len(mask):
+                # The mask only includes a subset of rows (e.g. columns 
+                # checked at their own expected times)
+                tfilter = tfilter.reindex(mask.index, fill_value=True)
+            mask[~tfilter] = True
+            
+        # The mask is transposed and converted to a numpy array to improve 
+        # performance. Values are reversed (T/F) to find blocks where quality 
+        # control tests failed.
+        failed = ~np.asarray(mask.values, dtype=bool).T
+        if not failed.any():
+            return
+
+        col, start_row, stop_row = _find_blocks(failed, min_failures)
+
+        if timestamp_test:
+            variable = ''
+        else:
+            variable = (list(mask.columns), col)
+
+        self._test_results_buffer.append(variable,
+                                         mask.index[start_row],
+                                         mask.index[stop_row],
+                                         stop_row - start_row + 1,
+                                         error_msg)
+
+    def _append_blocks(self, failed, variable, error_flag, min_failures, 
+                       rows=None, index=None):
+        """
+        Append QC results from a 2D boolean array (entries, rows), True = 
+        failed.  variable and error_flag are tuples of (list of names, code 
+        for each entry).  If rows is not None, failed only includes rows 
+        (row positions in self.df) and other rows pass the test.
+        
+        failed can also be a 2D integer array (columns, rows) of codes, 
+        0 = passed.  Code c in column i is entry (c-1)*ncols + i, and blocks 
+        are ordered by entry.  index is used for the start and end times 
+        (default = self.df.index).
         """
-
-        if not self.tfilter.empty:
-            mask[~self.tfilter] = True
-            
-        if mask.sum(axis=1).sum(axis=0) == mask.shape[0]*mask.shape[1]:
+        if not failed.any():
             return
         
-        # The mask is translated and then converted to an np array to improve performace.
-        # Values are reversed (T/F) to find blocks where quality control tests failed.
-        np_mask = ~mask.T.values 
-
-        start_nans_mask = np.hstack(
-            (np.resize(np_mask[:,0],(mask.shape[1],1)),
-             np.logical_and(np.logical_not(np_mask[:,:-1]), np_mask[:,1:])))
-        stop_nans_mask = np.hstack(
-            (np.logical_and(np_mask[:,:-1], np.logical_not(np_mask[:,1:])),
-             np.resize(np_mask[:,-1], (mask.shape[1],1))))
-        
-        start_col_idx, start_row_idx = np.where(start_nans_mask)
-        stop_col_idx, stop_row_idx = np.where(stop_nans_mask)
-
-        block = {'Start Row': list(start_row_idx),
-                  'Start Col': list(start_col_idx),
-                  'Stop Row': list(stop_row_idx),
-                  'Stop Col': list(stop_col_idx)}
-
-        # Extract test results from each block
-        counter=0
-        test_results = {}
-        for i in range(len(block['Start Col'])):
+        if index is None:
+            index = self.df.index
+        
+        if failed.dtype != bool:
+            col, start, stop, code = _find_code_blocks(failed)
+            col = (code.astype(int) - 1)*failed.shape[0] + col
+            order = np.argsort(col, kind='stable')
+            col, start, stop = col[order], start[order], stop[order]
+        else:
+            col, start, stop = _find_blocks(failed)
+        
+        if rows is None:
+            keep = (stop - start + 1) >= min_failures
+            col, start_row, stop_row = col[keep], start[keep], stop[keep]
+        else:
+            # Blocks are split at rows that were not evaluated (rows that 
+            # are not consecutive in self.df)
+            gap = np.flatnonzero(np.diff(rows) > 1) + 1 # first position after each gap
+            first = np.searchsorted(gap, start, side='right')
+            npieces = np.searchsorted(gap, stop, side='right') - first + 1
+            if (npieces > 1).any():
+                block = np.repeat(np.arange(len(start)), npieces)
+                piece = np.arange(len(block)) - np.repeat(np.cumsum(npieces) - npieces, npieces)
+                g = first[block] + piece
+                start = np.where(piece == 0, start[block], gap[np.maximum(g-1, 0)])
+                stop = np.where(piece == npieces[block]-1, stop[block], 
+                                gap[np.minimum(g, len(gap)-1)] - 1)
+                col = col[block]
             
-            timesteps = block['Stop Row'][i] - block['Start Row'][i] + 1
-            if timesteps >= min_failures:
-                if timestamp_test:
-                    var_name = ''
-                else:
-                    var_name = mask.iloc[:,block['Start Col'][i]].name 
-                
-                start_time = mask.index[block['Start Row'][i]]
-                end_time = mask.index[block['Stop Row'][i]]
-                    
-                test_results[counter] = {'Variable Name': var_name,
-                            'Start Time': start_time,
-                            'End Time': end_time,
-                            'Timesteps': timesteps, 
-                            'Error Flag': error_msg}
-                counter = counter + 1
-    
-        test_results = pd.DataFrame(test_results).T
-        self.test_results = pd.concat([self.test_results, test_results], ignore_index=True)
+            keep = (stop - start + 1) >= min_failures
+            col, start_row, stop_row = col[keep], rows[start[keep]], rows[stop[keep]]
         
+        self._test_results_buffer.append((variable[0], variable[1][col]),
+                                         index[start_row],
+                                         index[stop_row],
+                                         stop_row - start_row + 1,
+                                         (error_flag[0], error_flag[1][col]))
+
     def add_dataframe(self, data):
         """
         Add data to the PerformanceMonitoring object
@@ -230,10 +1801,32 @@ class PerformanceMonitoring(object):
         assert isinstance(data, pd.DataFrame), 'data must be of type pd.DataFrame'
         assert isinstance(data.index, pd.core.indexes.datetimes.DatetimeIndex), 'data.index must be a DatetimeIndex'
         
-        if self.df is not None:
-            self.df = data.combine_first(self.df)
-        else:
+        if self.dtype is not None:
+            data = self._astype(data)
+        
+        if self.df is None or self.df.shape == (0, 0):
+            # combine_first would store each column in a separate block
             self.df = data.copy()
+        elif self._new_columns(data):
+            # Data shares the index and only adds new columns, the new 
+            # columns are inserted into a shallow copy of the existing data
+            # (existing data is not copied, pandas consolidates the 
+            # blocks when needed)
+            df = self.df.copy(deep=False)
+            df.index = data.index
+            columns = data.columns.join(self.df.columns, how='outer')
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', pd.errors.PerformanceWarning)
+                for loc, col in enumerate(columns):
+                    if col in data.columns:
+                        df.insert(loc, col, data[col])
+            self.df = df
+        else:
+            self.df = data.combine_first(self.df)
+            if self.dtype is not None:
+                # Integer columns are converted to float if data is missing
+                self.df = self._astype(self.df)
+        self._update_version()
 
         # Add identity 1:1 translation dictionary
         trans = {}
@@ -242,6 +1835,35 @@ class PerformanceMonitoring(object):
 
         self.add_translation_dictionary(trans)
 
+    def _astype(self, data):
+        # Convert floating point columns to self.dtype
+        dtypes = {}
+        for col, dtype in data.dtypes.items():
+            if pd.api.types.is_float_dtype(dtype) and dtype != self.dtype:
+                dtypes[col] = self.dtype
+        if len(dtypes) == 0:
+            return data
+        
+        return data.astype(dtypes, copy=False)
+
+    def _new_columns(self, data):
+        # True if data has the same index as self.df and only includes 
+        # new columns that can be inserted without reordering self.df
+        if self.df.empty or data.empty or not data.columns.is_unique or \
+                not self.df.columns.is_unique:
+            return False
+        if not data.index.equals(self.df.index) or \
+                data.index.dtype != self.df.index.dtype or \
+                data.index.name != self.df.index.name:
+            return False
+        if self.df.columns.isin(data.columns).any():
+            return False
+        
+        # The order of existing columns is unchanged
+        columns = data.columns.join(self.df.columns, how='outer')
+        
+        return columns[columns.isin(self.df.columns)].equals(self.df.columns)
+
     def add_translation_dictionary(self, trans):
         """
         Add translation dictionary to the PerformanceMonitoring object
@@ -258,7 +1880,7 @@ class PerformanceMonitoring(object):
             for value in values:
                 self.trans[key].append(value)
 
-    def add_time_filter(self, time_filter):
+    def add_time_filter(self, time_filter, compress=False):
         """
         Add a time filter to the PerformanceMonitoring object
 
@@ -268,25 +1890,40 @@ class PerformanceMonitoring(object):
             Time filter containing boolean values for each time index
             True = keep time index in the quality control results.
             False = remove time index from the quality control results.
+        
+        compress : boolean, optional
+            When True, the range, increment, and missing data tests only 
+            evaluate rows where the time filter is True.  Test results are 
+            the same, default = False
         """
         assert isinstance(time_filter, (pd.Series, pd.DataFrame)), 'time_filter must be of type pd.Series or pd.DataFrame'
+        assert isinstance(compress, bool), 'compress must be of type bool'
         
+        self._compress_tfilter = compress
         if isinstance(time_filter, pd.DataFrame) and (time_filter.shape[1] == 1):
             self.tfilter = time_filter.squeeze()
         else:
             self.tfilter = time_filter
+        self._update_version()
 
     def check_timestamp(self, frequency, expected_start_time=None,
                         expected_end_time=None, min_failures=1,
-                        exact_times=True):
+                        exact_times=True, reindex=True):
         """
         Check time series for missing, non-monotonic and duplicate
         timestamps
 
         Parameters
         ----------
-        frequency : int or float
-            Expected time series frequency, in seconds
+        frequency : int, float, or dict
+            Expected time series frequency, in seconds.  A dictionary can be 
+            used to define the frequency for each data column name or 
+            translation dictionary key (e.g. {'Inverter': 1, 'Weather': 60}).
+            Each group of columns is then checked using the timestamps where 
+            the group has data, missing timestamps are reported for each 
+            column, and check_missing only checks the expected times of each 
+            group.  Columns that are not included are not checked for 
+            missing timestamps.
 
         expected_start_time : Timestamp, optional
             Expected start time. If not specified, the minimum timestamp
@@ -308,83 +1945,190 @@ class PerformanceMonitoring(object):
             If False, times only need to occur once or more within each
             interval (specified in frequency) and the DataFrame is not
             reindexed.
+        
+        reindex : bool, optional
+            If True and exact_times is True, the DataFrame is reindexed to 
+            match the expected frequency.  If False, missing timestamps are 
+            included in the test results, but the DataFrame is not reindexed.
+            default = True
         """
-        assert isinstance(frequency, (int, float)), 'frequency must be of type int or float'
+        assert isinstance(frequency, (int, float, dict)), 'frequency must be of type int, float, or dict'
+        if isinstance(frequency, dict):
+            for value in frequency.values():
+                assert isinstance(value, (int, float)), 'frequency values must be of type int or float'
         assert isinstance(expected_start_time, (NoneType, pd.Timestamp)), 'expected_start_time must be None or of type pd.Timestamp'
         assert isinstance(expected_end_time, (NoneType, pd.Timestamp)), 'expected_end_time must be None or of type pd.Timestamp'
         assert isinstance(min_failures, int), 'min_failures must be of type int'
         assert isinstance(exact_times, bool), 'exact_times must be of type bool'
+        assert isinstance(reindex, bool), 'reindex must be of type bool'
         
         logger.info("Check timestamp")
 
         if self.df.empty:
             logger.info("Empty database")
             return
-        if expected_start_time is None:
-            expected_start_time = min(self.df.index)
-        if expected_end_time is None:
-            expected_end_time = max(self.df.index)
-
-        rng = pd.date_range(start=expected_start_time, end=expected_end_time,
-                            freq=str(int(frequency*1e3)) + 'ms') # milliseconds
 
+        # Duplicate and non-monotonic timestamps are found using the index 
+        # values (int64), the data is only copied once to sort and drop 
+        # duplicates.  Rows that have the same timestamp as the first row 
+        # are not flagged.
+        index = self.df.index
+        values = index.asi8
+        
         # Check to see if timestamp is monotonic
-#        mask = pd.TimeSeries(self.df.index).diff() < 0
-        mask = ~(pd.Series(self.df.index).diff() < pd.Timedelta('0 days 00:00:00'))
-        mask.index = self.df.index
-        mask[mask.index[0]] = True
-        mask = pd.DataFrame(mask)
-        mask.columns = [0]
+        mask = np.ones(len(values), dtype=bool)
+        mask[1:] = values[1:] >= values[:-1]
+        mask[values == values[0]] = True
+        mask = pd.DataFrame({0: mask}, index=index)
 
         self._append_test_results(mask, 'Nonmonotonic timestamp',
                                  timestamp_test=True,
                                  min_failures=min_failures)
 
-        # If not monotonically increasing, sort df by timestamp
-        if not self.df.index.is_monotonic_increasing:
-            self.df = self.df.sort_index()
-
-        # Check for duplicate timestamps
-#        mask = pd.TimeSeries(self.df.index).diff() == 0
-        mask = ~(pd.Series(self.df.index).diff() == pd.Timedelta('0 days 00:00:00'))
-        mask.index = self.df.index
-        mask[mask.index[0]] = True
-        mask = pd.DataFrame(mask)
-        mask.columns = [0]
-        mask['TEMP'] = mask.index # remove duplicates in the mask
-        mask.drop_duplicates(subset='TEMP', keep='last', inplace=True)
-        del mask['TEMP']
-
+        # If not monotonically increasing, sort by timestamp
+        if index.is_monotonic_increasing:
+            order = None
+        else:
+            order = index.argsort()
+            values = values[order]
+
+        # Check for duplicate timestamps, the first row of each timestamp 
+        # is kept
+        first = np.ones(len(values), dtype=bool)
+        first[1:] = values[1:] != values[:-1]
+        rows = np.flatnonzero(first)
+        mask = np.diff(np.append(rows, len(values))) == 1
+        mask[0] = True
+        if order is not None:
+            rows = order[rows]
+        
         # Drop duplicate timestamps (this has to be done before the
         # results are appended)
-        self.df['TEMP'] = self.df.index
-        #self.df.drop_duplicates(subset='TEMP', take_last=False, inplace=True)
-        self.df.drop_duplicates(subset='TEMP', keep='first', inplace=True)
+        if order is not None or len(rows) < len(values):
+            self.df = self.df.take(rows)
+        mask = pd.DataFrame({0: mask}, index=self.df.index)
 
         self._append_test_results(mask, 'Duplicate timestamp',
                                  timestamp_test=True,
                                  min_failures=min_failures)
-        del self.df['TEMP']
 
+        if isinstance(frequency, dict):
+            # Each group of columns is checked using its own frequency and 
+            # the timestamps where the group has data
+            self._native_timestamps = {}
+            rng = None
+            for key, group_frequency in frequency.items():
+                df = self._setup_data(key)
+                if df is None:
+                    continue
+                index = self.df.index[df.notnull().values.any(axis=1)]
+                if len(index) == 0:
+                    continue
+                start_time = expected_start_time
+                if start_time is None:
+                    start_time = index.min()
+                end_time = expected_end_time
+                if end_time is None:
+                    end_time = index.max()
+                
+                grid = self._missing_timestamps(index, group_frequency, start_time, 
+                    end_time, min_failures, exact_times, df.columns)
+                
+                if exact_times:
+                    origin, step, nsteps = grid
+                    for col in df.columns:
+                        self._native_timestamps[col] = (origin, step, nsteps)
+                    if reindex:
+                        # Values that are not at an expected time are removed
+                        on_step = _on_step(self.df.index, origin, step, nsteps)
+                        if not on_step.all():
+                            self.df.loc[~on_step, list(df.columns)] = np.nan
+                        group_rng = pd.date_range(start=start_time, end=end_time,
+                            freq=str(int(group_frequency*1e3)) + 'ms')
+                        rng = group_rng if rng is None else rng.union(group_rng)
+            
+            if rng is not None:
+                self.df = self.df.reindex(index=rng)
+        else:
+            if expected_start_time is None:
+                expected_start_time = self.df.index.min()
+            if expected_end_time is None:
+                expected_end_time = self.df.index.max()
+            
+            self._native_timestamps = {}
+            self._missing_timestamps(self.df.index, frequency, expected_start_time, 
+                expected_end_time, min_failures, exact_times)
+            
+            if exact_times and reindex:
+                rng = pd.date_range(start=expected_start_time, end=expected_end_time,
+                                    freq=str(int(frequency*1e3)) + 'ms') # milliseconds
+                self.df = self.df.reindex(index=rng)
+
+    def _missing_timestamps(self, index, frequency, expected_start_time, 
+                            expected_end_time, min_failures, exact_times, 
+                            columns=None):
+        """
+        Append missing timestamps in index to the test results.  If columns 
+        is None, the test results apply to all columns.  Returns the 
+        start time, step (in nanoseconds) and number of expected times when 
+        exact_times is True.
+        """
+        # Missing timestamps are found from the gaps between timestamps 
+        # (converted to steps of the expected frequency)
+        step = int(frequency*1e3)*1000000 # milliseconds, converted to nanoseconds
         if exact_times:
-            temp = pd.Index(rng)
-            missing = temp.difference(self.df.index).tolist()
-            # reindex DataFrame
-            self.df = self.df.reindex(index=rng)
-            mask = pd.DataFrame(data=self.df.shape[0]*[True],
-                                index=self.df.index)
-            mask.loc[missing] = False
-            self._append_test_results(mask, 'Missing timestamp',
-                                 timestamp_test=True,
-                                 min_failures=min_failures)
+            # Steps from the expected start time, timestamps that are not 
+            # on a step are not used
+            origin = expected_start_time
+            nsteps = max((expected_end_time - origin).value//step + 1, 0)
+            offset = (index - origin).values.astype('timedelta64[ns]').view('int64')
+            on_step = (offset % step == 0) & (offset >= 0) & (offset < nsteps*step)
+            present = offset[on_step]//step
+            first_step = 0
+        else:
+            # Bins start at midnight on the first day (the same as resample)
+            origin = index[0].normalize()
+            offset = (index - origin).values.astype('timedelta64[ns]').view('int64')
+            present = np.unique(offset//step)
+            first_step = present[0]
+            present = present - first_step
+            nsteps = present[-1] + 1
+        
+        start_step, stop_step = _missing_steps(present, nsteps)
+        
+        if self.tfilter.empty:
+            timesteps = stop_step - start_step + 1
+            keep = timesteps >= min_failures
+            start_time = origin + pd.to_timedelta((start_step[keep] + first_step)*step, unit='ns')
+            end_time = origin + pd.to_timedelta((stop_step[keep] + first_step)*step, unit='ns')
+            timesteps = timesteps[keep]
+            if columns is None:
+                variable = ''
+            else:
+                # One row for each column
+                nruns = len(timesteps)
+                variable = (list(columns), np.repeat(np.arange(len(columns)), nruns))
+                start_time = start_time[np.tile(np.arange(nruns), len(columns))]
+                end_time = end_time[np.tile(np.arange(nruns), len(columns))]
+                timesteps = np.tile(timesteps, len(columns))
+            self._update_version()
+            self._test_results_buffer.append(variable, start_time, end_time, 
+                                             timesteps, 'Missing timestamp')
         else:
-            # uses pandas >= 0.18 resample syntax
-            df_index = pd.DataFrame(index=self.df.index)
-            df_index[0]=1 # populate with placeholder values
-            mask = ~(df_index.resample(str(int(frequency*1e3))+'ms').count() == 0) # milliseconds
+            # The time filter is applied to a mask with each expected time
+            index = origin + pd.to_timedelta((np.arange(nsteps) + first_step)*step, unit='ns')
+            mask = ~_paint_intervals(start_step, stop_step+1, nsteps)
+            if columns is None:
+                mask = pd.DataFrame({0: mask}, index=index)
+            else:
+                mask = pd.DataFrame(np.repeat(mask[:, None], len(columns), axis=1), 
+                                    index=index, columns=columns)
             self._append_test_results(mask, 'Missing timestamp',
-                                 timestamp_test=True,
+                                 timestamp_test=columns is None,
                                  min_failures=min_failures)
+        
+        if exact_times:
+            return origin, step, nsteps
 
     def check_range(self, bound, key=None, min_failures=1):
         """
@@ -392,9 +2136,14 @@ class PerformanceMonitoring(object):
 
         Parameters
         ----------
-        bound : list of floats
+        bound : list of floats, dict, or pandas DataFrame
             [lower bound, upper bound], None can be used in place of a lower
-            or upper bound
+            or upper bound.  Each bound can be time-varying, defined using a 
+            pandas Series (used for every column) or DataFrame (one column 
+            per data column) indexed by time, NaN = no bound.  
+            A dictionary of key: [lower bound, upper bound], 
+            or a DataFrame indexed by column name with lower and upper bound 
+            columns, tests several keys at once (key must be None).
 
         key : string, optional
             Data column name or translation dictionary key.  If not specified, 
@@ -404,19 +2153,28 @@ class PerformanceMonitoring(object):
             Minimum number of consecutive failures required for reporting,
             default = 1
         """
-        assert isinstance(bound, list), 'bound must be of type list'
+        assert isinstance(bound, (list, dict, pd.DataFrame)), 'bound must be of type list, dict, or pd.DataFrame'
         assert isinstance(key, (NoneType, str)), 'key must be None or of type string'
         assert isinstance(min_failures, int), 'min_failures must be of type int'
         
         logger.info("Check for data outside expected range")
+        
+        if not isinstance(bound, list):
+            assert key is None, 'key must be None if bound is a dict or pd.DataFrame'
+            self._bounds_test_results(_bounds_dict(bound), min_failures, 'Data')
+            return
 
         df = self._setup_data(key)
         if df is None:
             return
+        
+        rows = self._active_rows()
+        if rows is not None:
+            df = df.take(rows)
 
         error_prefix = 'Data'
 
-        self._generate_test_results(df, bound, min_failures, error_prefix)
+        self._generate_test_results(df, bound, min_failures, error_prefix, rows)
 
     def check_increment(self, bound, key=None, increment=1, absolute_value=True, 
                         min_failures=1):
@@ -425,9 +2183,14 @@ class PerformanceMonitoring(object):
 
         Parameters
         ----------
-        bound : list of floats
+        bound : list of floats, dict, or pandas DataFrame
             [lower bound, upper bound], None can be used in place of a lower
-            or upper bound
+            or upper bound.  Each bound can be time-varying, defined using a 
+            pandas Series (used for every column) or DataFrame (one column 
+            per data column) indexed by time, NaN = no bound.  
+            A dictionary of key: [lower bound, upper bound], 
+            or a DataFrame indexed by column name with lower and upper bound 
+            columns, tests several keys at once (key must be None).
 
         key : string, optional
             Data column name or translation dictionary key. If not specified, 
@@ -443,13 +2206,24 @@ class PerformanceMonitoring(object):
             Minimum number of consecutive failures required for reporting,
             default = 1
         """
-        assert isinstance(bound, list), 'bound must be of type list'
+        assert isinstance(bound, (list, dict, pd.DataFrame)), 'bound must be of type list, dict, or pd.DataFrame'
         assert isinstance(key, (NoneType, str)), 'key must be None or of type string'
         assert isinstance(increment, int), 'increment must be of type int'
         assert isinstance(absolute_value, bool), 'absolute_value must be of type bool'
         assert isinstance(min_failures, int), 'min_failures must be of type int'
         
         logger.info("Check for data increment outside expected range")
+        
+        if absolute_value:
+            error_prefix = '|Increment|'
+        else:
+            error_prefix = 'Increment'
+        
+        if not isinstance(bound, list):
+            assert key is None, 'key must be None if bound is a dict or pd.DataFrame'
+            self._bounds_test_results(_bounds_dict(bound), min_failures, 
+                                      error_prefix, increment, absolute_value)
+            return
 
         df = self._setup_data(key)
         if df is None:
@@ -460,17 +2234,10 @@ class PerformanceMonitoring(object):
             return
 
         # Compute interval
-        if absolute_value:
-            df = np.abs(df.diff(periods=increment))
-        else:
-            df = df.diff(periods=increment)
-
-        if absolute_value:
-            error_prefix = '|Increment|'
-        else:
-            error_prefix = 'Increment'
+        df, rows = self._increment_data(df, increment, absolute_value, 
+                                        self._active_rows())
 
-        self._generate_test_results(df, bound, min_failures, error_prefix)
+        self._generate_test_results(df, bound, min_failures, error_prefix, rows)
     
 
     def check_delta(self, bound, window, key=None, direction=None, 
@@ -520,85 +2287,13 @@ class PerformanceMonitoring(object):
             return
 
         window_str = str(int(window*1e3)) + 'ms' # milliseconds
+        diff_df = _rolling_delta(df, window_str)
 
-        min_df = df.rolling(window_str, min_periods=2, closed='both').min()
-        max_df = df.rolling(window_str, min_periods=2, closed='both').max()
-
-        diff_df = max_df - min_df
-        diff_df.loc[diff_df.index[0]:diff_df.index[0]+pd.Timedelta(window_str),:] = None
-        
-        def update_mask(mask1, df, window_str, bound, direction):
-            # While the mask flags data at the time at which the failure occurs, 
-            # the actual timespan betwen the min and max should be flagged so that 
-            # the final results include actual data points that caused the failure.
-            # This function uses numpy arrays to improve performance and returns
-            # a mask DataFrame.
-            mask2 = np.ones((len(mask1.index), len(mask1.columns)), dtype=bool)
-            index = mask1.index
-            # Loop over t, col in mask1 where condition is True
-            for t,col in list(mask1[mask1 == 0].stack().index):
-                icol = mask1.columns.get_loc(col)
-                it = mask1.index.get_loc(t)
-                t1 = t-pd.Timedelta(window_str)
-
-                if (bound == 'lower') and (direction is None):
-                    # set the entire time interval to True
-                    mask2[(index >= t1) & (index <= t),icol] = False
-                
-                else: 
-                    # extract the min and max time
-                    min_time = df.loc[t1:t,col].idxmin()
-                    max_time = df.loc[t1:t,col].idxmax()
-                    
-                    if bound == 'lower': # bound = upper, direction = positive or negative
-                        # set the entire time interval to True
-                        if (direction == 'positive') and (min_time <= max_time):
-                            mask2[(index >= t1) & (index <= t),icol] = False
-                        elif (direction == 'negative') and (min_time >= max_time):
-                            mask2[(index >= t1) & (index <= t),icol] = False
-                    
-                    elif bound == 'upper': # bound = upper, direction = None, positive or negative
-                        # set the initially flaged location to False
-                        mask2[it,icol] = True
-                        # set the time between max/min or min/max to true
-                        if min_time < max_time and (direction is None or direction == 'positive'):
-                            mask2[(index >= min_time) & (index <= max_time),icol] = False
-                        elif min_time > max_time and (direction is None or direction == 'negative'):
-                            mask2[(index >= max_time) & (index <= min_time),icol] = False
-                        elif min_time == max_time:
-                            mask2[it,icol] = False
-                        
-            mask2 = pd.DataFrame(mask2, columns=mask1.columns, index=mask1.index)
-            return mask2
-        
-        if direction == 'positive':
-            error_prefix = 'Delta (+)'
-        elif direction == 'negative':
-            error_prefix = 'Delta (-)'
-        else:
-            error_prefix = 'Delta'
-        
-        # Lower Bound
-        if bound[0] not in none_list:
-            mask = ~(diff_df < bound[0])
-            error_msg = error_prefix+' < lower bound, '+str(bound[0])
-            if not self.tfilter.empty:
-                mask[~self.tfilter] = True
-            mask = update_mask(mask, df, window_str, 'lower', direction) 
-            self._append_test_results(mask, error_msg, min_failures)
-        
-        # Upper Bound
-        if bound[1] not in none_list:
-            mask = ~(diff_df > bound[1])
-            error_msg = error_prefix+' > upper bound, '+str(bound[1])
-            if not self.tfilter.empty:
-                mask[~self.tfilter] = True
-            mask = update_mask(mask, df, window_str, 'upper', direction) 
-            self._append_test_results(mask, error_msg, min_failures)
-
+        self._delta_test_results(df, diff_df, bound, window_str, direction, 
+                                 min_failures)
 
     def check_outlier(self, bound, window=None, key=None, absolute_value=False, streaming=False, 
-                      min_failures=1):
+                      min_failures=1, history=None):
         """
         Check for outliers using normalized data within a rolling window
         
@@ -609,7 +2304,8 @@ class PerformanceMonitoring(object):
         ----------
         bound : list of floats
             [lower bound, upper bound], None can be used in place of a lower
-            or upper bound
+            or upper bound.  If streaming is False, each bound can be 
+            time-varying (see check_range).
 
         window : int or float, optional
             Size of the rolling window (in seconds) used to normalize data,
@@ -630,6 +2326,12 @@ class PerformanceMonitoring(object):
         min_failures : int, optional
             Minimum number of consecutive failures required for reporting,
             default = 1
+        
+        history : StreamingHistory, optional
+            Cleaned history used by the streaming analysis.  The history is 
+            updated with the data, and can be passed to the next call to 
+            continue the analysis on new data.  If not specified, a new 
+            history is used.
         """
         assert isinstance(bound, list), 'bound must be of type list'
         assert isinstance(window, (NoneType, int, float)), 'window must be None or of type int or float'
@@ -637,27 +2339,9 @@ class PerformanceMonitoring(object):
         assert isinstance(absolute_value, bool), 'absolute_value must be of type bool'
         assert isinstance(streaming, bool), 'streaming must be of type bool'
         assert isinstance(min_failures, int), 'min_failures must be type int'
+        assert isinstance(history, (NoneType, StreamingHistory)), 'history must be None or of type StreamingHistory'
         assert self.df.index.is_monotonic_increasing, 'index must be monotonically increasing'
         
-        def outlier(data_pt, history):
-
-            mean = history.mean()
-            std = history.std()
-            zt = (data_pt - mean)/std
-            zt.replace([np.inf, -np.inf], np.nan, inplace=True)
-            
-            # True = pass, False = fail
-            if absolute_value:
-                zt = abs(zt)
-            
-            mask = pd.Series(True, index=zt.index)
-            if bound[0] not in none_list:
-                mask = mask & (zt >= bound[0])
-            if bound[1] not in none_list:   
-                mask = mask & (zt <= bound[1])
-            
-            return mask, zt
-
         logger.info("Check for outliers")
 
         df = self._setup_data(key)
@@ -670,18 +2354,18 @@ class PerformanceMonitoring(object):
             error_prefix = 'Outlier'
             
         if streaming:
-            metadata = self.check_custom_streaming(outlier, window, rebase=0.5, min_failures=min_failures, error_message=error_prefix)
+            assert isinstance(window, (int, float)), 'window must be of type int or float'
+            assert not any(_time_varying(b) for b in bound), 'time-varying bounds are not supported by the streaming analysis'
+            if history is None:
+                history = StreamingHistory()
+            history_window = datetime.timedelta(seconds=window)
+            np_mask = _streaming_outlier(history, df, history_window, bound, 
+                                         absolute_value, rebase=0.5)
+            mask = pd.DataFrame(np_mask, index=df.index, columns=df.columns)
+            self._append_test_results(mask, error_prefix, min_failures)
         else:
             # Compute normalized data
-            if window is not None:
-                window_str = str(int(window*1e3)) + 'ms' # milliseconds
-                df_mean = df.rolling(window_str, min_periods=2, closed='both').mean()
-                df_std = df.rolling(window_str, min_periods=2, closed='both').std()
-                df = (df - df_mean)/df_std
-            else:
-                df = (df - df.mean())/df.std()
-            
-            df.replace([np.inf, -np.inf], np.nan, inplace=True)
+            df = _normalize(df, window)
             
             if absolute_value:
                 df = np.abs(df)
@@ -713,16 +2397,40 @@ class PerformanceMonitoring(object):
         if df is None:
             return
 
+        # Columns checked with their own frequency in check_timestamp are 
+        # only checked at their expected times
+        groups = {}
+        for col in df.columns:
+            if col in self._native_timestamps:
+                groups.setdefault(self._native_timestamps[col], []).append(col)
+        
         # Extract missing data
+        rows = None
+        if not groups:
+            rows = self._active_rows()
+        if rows is not None:
+            df = df.take(rows)
         mask = ~pd.isnull(df) # checks for np.nan, np.inf, True = passed test
 
         # Check to see if the missing data was already flagged as a missing timestamp
-        missing_timestamps = self.test_results[
-                self.test_results['Error Flag'] == 'Missing timestamp']
-        for index, row in missing_timestamps.iterrows():
-            mask.loc[row['Start Time']:row['End Time']] = True
-
-        self._append_test_results(mask, 'Missing data', min_failures=min_failures)
+        results_index = self.results_index
+        missing = results_index.contains(mask.index, '', 'Missing timestamp')
+        if missing.any():
+            mask.loc[missing, :] = True
+        for col in mask.columns:
+            missing = results_index.contains(mask.index, col, 'Missing timestamp')
+            if missing.any():
+                mask.loc[missing, col] = True
+
+        group_mask = mask
+        if groups:
+            mask = mask.drop(columns=sum(groups.values(), []))
+        self._append_test_results(mask, 'Missing data', min_failures=min_failures, 
+                                  rows=rows)
+        for (origin, step, nsteps), columns in groups.items():
+            on_step = _on_step(group_mask.index, origin, step, nsteps)
+            self._append_test_results(group_mask.loc[on_step, columns], 
+                                      'Missing data', min_failures=min_failures)
 
     def check_corrupt(self, corrupt_values, key=None, min_failures=1):
         """
@@ -754,8 +2462,11 @@ class PerformanceMonitoring(object):
         # Extract corrupt data
         mask = ~df.isin(corrupt_values) # True = passed test
 
-        # Replace corrupt data with NaN
-        self.df[~mask] = np.nan
+        # Replace corrupt data with NaN, only columns with corrupt data are 
+        # modified
+        for col in mask.columns[~mask.all().values]:
+            self.df[col] = self.df[col].where(mask[col])
+        self._update_version()
 
         self._append_test_results(mask, 'Corrupt data', min_failures=min_failures)
 
@@ -786,7 +2497,7 @@ class PerformanceMonitoring(object):
         assert isinstance(min_failures, int), 'min_failures must be type int'
         assert isinstance(error_message, (NoneType, str)), 'error_message must be None or of type string'
 
-        df = self._setup_data(key)
+        df = self._setup_data(key, copy=True)
         if df is None:
             return
         
@@ -805,7 +2516,8 @@ class PerformanceMonitoring(object):
         return metadata
     
     def check_custom_streaming(self, quality_control_func, window, key=None, 
-                               rebase=None, min_failures=1, error_message=None):
+                               rebase=None, min_failures=1, error_message=None,
+                               raw=False, block_size=None, history=None):
         """
         Check for anomolous data using a streaming framework which removes 
         anomolous data from the history after each timestamp.  A custom quality 
@@ -836,6 +2548,30 @@ class PerformanceMonitoring(object):
             
         error_message : str, optional
             Error message
+        
+        raw : boolean, optional
+            If True, the quality control function is passed numpy arrays 
+            (data_pt is a 1D array with one value per column, history is a 
+            read-only 2D array view) and returns a mask and metadata as 1D 
+            arrays with one value per column.  This avoids creating pandas 
+            objects at each timestamp.  Default = False
+        
+        block_size : int or None, optional
+            If specified, the quality control function evaluates a block 
+            of up to block_size timestamps at once using numpy arrays.  
+            The function is called as 
+            quality_control_func(data_pts, history, window_start, window_end), 
+            where data_pts is a 2D array with one row per timestamp, and the 
+            history for data point k is history[window_start[k]:window_end[k]].
+            The function returns a mask and metadata with one row per 
+            timestamp.  When a data point is flagged, the rest of the block is 
+            evaluated again using the updated history.  Default = None
+        
+        history : StreamingHistory, optional
+            Cleaned history used by the streaming analysis.  The history is 
+            updated with the data, and can be passed to the next call to 
+            continue the analysis on new data.  If not specified, a new 
+            history is used.
         """
         assert callable(quality_control_func), 'quality_control_func must be a callable function'
         assert isinstance(window, (int, float)), 'window must be of type int or float'
@@ -843,67 +2579,742 @@ class PerformanceMonitoring(object):
         assert isinstance(rebase, (NoneType, int, float)), 'rebase must be None or type int or float'
         assert isinstance(min_failures, int), 'min_failures must be type int'
         assert isinstance(error_message, (NoneType, str)), 'error_message must be None or of type string'
+        assert isinstance(raw, bool), 'raw must be of type bool'
+        assert isinstance(block_size, (NoneType, int)), 'block_size must be None or of type int'
+        assert block_size is None or block_size > 0, 'block_size must be greater than 0'
+        assert isinstance(history, (NoneType, StreamingHistory)), 'history must be None or of type StreamingHistory'
 
         df = self._setup_data(key)
         if df is None:
             return
         
+        if history is None:
+            history = StreamingHistory()
+        
         metadata = {} 
         rebase_count = 0
         history_window = datetime.timedelta(seconds=window)
         
         # The mask must be the same size as data
-        # The streaming framework uses numpy arrays to improve performance but
-        # still expects pandas DataFrames and Series in the user defined quality 
-        # control function to keep data types consitent on the user side.
-        np_mask = pd.DataFrame(True, index=df.index, columns=df.columns).values
-        np_data = df.values.astype('float64')
-    
-        ti = df.index.get_loc(df.index[0]+history_window)
+        # The streaming framework uses numpy arrays to improve performance.
+        # Unless raw is True, the user defined quality control function is 
+        # still passed pandas DataFrames and Series to keep data types 
+        # consistent on the user side.
+        np_mask = np.ones(df.shape, dtype=bool)
+        raw_data = df.values.astype(_float_dtype(df))
+        timestamps = df.index.values
+        nrows, ncols = raw_data.shape
         
-        for i, t in enumerate(np.arange(ti,np_data.shape[0],1)):
-
-            #t_start = df.index.get_loc(df.index[t]-history_window, method='nearest')
-            t_start = df.index.get_indexer([df.index[t]-history_window], method='nearest')[0]
-            t_timestamp = df.index[t]
+        # The cleaned history is stored in a ring buffer, rows are numbered 
+        # continuously across calls (rows[t] is the row number of data row t)
+        ti, rows, window_start, keep_from = history._prepare(df, history_window, 
+                                                             block_size or 1)
+        
+        # Number of NaN values in each column of the history window and 
+        # current data point, rows [nan_start, nan_stop) are counted
+        nan_count = np.zeros(ncols, dtype=int)
+        if ti < nrows:
+            nan_start = window_start[ti]
+        else:
+            nan_start = rows[0]
+        nan_stop = nan_start
+        restored = history._restored # row and columns restored by rebase at the previous timestamp
+        
+        def keep(t):
+            # First row of the history that is still needed
+            if rebase is None:
+                return keep_from[t]
+            return min(keep_from[t], nan_start)
+        
+        def update(t, mask_t):
+            # Anomalous data is removed from the history, only the current 
+            # row (and a row restored by rebase at the previous timestamp) 
+            # can change.  Returns True if the cleaned data changed.
+            nonlocal nan_count, nan_start, nan_stop, restored, rebase_count
             
-            data_pt = pd.Series(np_data[t], index=df.columns)
-            history = pd.DataFrame(np_data[t_start:t], index=range(t-t_start), columns=df.columns)
-
-            mask_t, metadata[t_timestamp] = quality_control_func(data_pt, history)
-            if i == 0:
-                assert isinstance(mask_t, pd.Series), 'mask returned by quality_control_func must be of type pd.Series'
-                assert isinstance(metadata[t_timestamp], pd.Series), 'metadata returned by quality_control_func must be of type pd.Series'
-
-            np_mask[t] = mask_t.values
-            np_data[~np_mask] = np.nan
+            row = rows[t]
+            t_start = window_start[t]
+            np_mask[t] = mask_t
+            changed = (~mask_t & ~np.isnan(history._row(row))).any()
+            history._set(row, ~mask_t, np.nan)
+            if restored is not None:
+                r, columns = restored
+                if r >= history._first:
+                    before = np.isnan(history._row(r))
+                    history._set(r, columns, np.nan)
+                    if nan_start <= r < nan_stop:
+                        nan_count = nan_count + (np.isnan(history._row(r)) & ~before)
+                changed = changed or columns.any()
+                restored = None
        
             # rebase
             if rebase is not None:
-                data_history = np_data[t_start:t+1] # +1 so it includes history and current data point
-                check_rebase = np.isnan(data_history).sum(axis=0)/data_history.shape[0] > rebase
+                # Update the NaN count for rows [t_start, row+1)
+                for r in range(nan_stop, row+1):
+                    nan_count = nan_count + np.isnan(history._row(r))
+                for r in range(nan_start, t_start):
+                    nan_count = nan_count - np.isnan(history._row(r))
+                nan_start, nan_stop = t_start, row+1
+                
+                check_rebase = nan_count/(row+1-t_start) > rebase
                 if sum(check_rebase) > 0:
-                    np_data[t][check_rebase] = df.iloc[t][check_rebase]
+                    before = np.isnan(history._row(row))
+                    history._set(row, check_rebase, raw_data[t][check_rebase])
+                    nan_count = nan_count - (before & ~np.isnan(history._row(row)))
+                    # Restored values are removed from the history after 
+                    # the next timestamp is analyzed
+                    restored = (row, check_rebase & ~np_mask[t])
                     rebase_count = rebase_count + sum(check_rebase)
+                    changed = True
+            
+            return changed
+        
+        raw_metadata = []
+        if block_size is not None:
+            t = ti
+            while t < nrows:
+                # A single timestamp is evaluated after a rebase, the 
+                # restored row is removed from the history after that 
+                # timestamp
+                stop = t+1 if restored is not None else min(t+block_size, nrows)
+                h_start = window_start[t]
+                history._update(timestamps, raw_data, rows[0], rows[0]+stop, keep(t))
+                read_only = history._view(h_start, rows[0]+stop)
+                mask_block, metadata_block = quality_control_func(read_only[rows[t]-h_start:], 
+                    read_only, window_start[t:stop]-h_start, rows[t:stop]-h_start)
+                mask_block = np.asarray(mask_block, dtype=bool)
+                assert mask_block.shape == (stop-t, ncols), 'mask returned by quality_control_func must be a 2D array with one row per data point and one column per data column'
+                
+                # Results are accepted up to the first timestamp that 
+                # changes the cleaned data, the remaining timestamps in the 
+                # block are evaluated again using the updated history
+                for k in range(stop-t):
+                    changed = update(t, mask_block[k])
+                    raw_metadata.append(metadata_block[k])
+                    t = t+1
+                    if changed:
+                        break
+        else:
+            for i, t in enumerate(np.arange(ti,nrows,1)):
+    
+                row = rows[t]
+                t_start = window_start[t]
+                t_timestamp = df.index[t]
+                history._update(timestamps, raw_data, rows[0], row+1, keep(t))
+                
+                if raw:
+                    read_only = history._view(t_start, row+1)
+                    mask_t, metadata_t = quality_control_func(read_only[-1], read_only[:-1])
+                    mask_t = np.asarray(mask_t, dtype=bool)
+                    if i == 0:
+                        assert mask_t.shape == (ncols,), 'mask returned by quality_control_func must be a 1D array with one value per column'
+                    raw_metadata.append(metadata_t)
+                else:
+                    data_pt = pd.Series(history._row(row), index=df.columns)
+                    history_df = pd.DataFrame(history._rows(t_start, row), index=range(row-t_start), columns=df.columns)
+        
+                    mask_t, metadata[t_timestamp] = quality_control_func(data_pt, history_df)
+                    if i == 0:
+                        assert isinstance(mask_t, pd.Series), 'mask returned by quality_control_func must be of type pd.Series'
+                        assert isinstance(metadata[t_timestamp], pd.Series), 'metadata returned by quality_control_func must be of type pd.Series'
+                    mask_t = mask_t.values
+                
+                update(t, mask_t)
+        
+        history._restored = restored
         
         mask = pd.DataFrame(np_mask, index=df.index, columns=df.columns)
         self._append_test_results(mask, error_message, min_failures)
         
         # Convert metadata to a dataframe
-        metadata = pd.DataFrame(metadata).T
+        if raw or block_size is not None:
+            metadata = pd.DataFrame(np.array(raw_metadata), index=df.index[ti:])
+            if metadata.shape[1] == ncols:
+                metadata.columns = df.columns
+        else:
+            metadata = pd.DataFrame(metadata).T
         
         return metadata
 
         
+class _BlockStitcher(object):
+    """
+    Stitch failure blocks from consecutive, overlapping chunks of data.  
+    Blocks are stored using global row positions (stop row is inclusive), 
+    blocks with the same key that overlap or are adjacent are merged.
+    """
+
+    def __init__(self):
+        self._blocks = {}
+
+    def keys(self):
+        return list(self._blocks.keys())
+
+    def add(self, key, start_row, stop_row, start_time, end_time):
+        """
+        Add blocks, start_row and stop_row are numpy arrays of global row 
+        positions, start_time and end_time are pandas Index
+        """
+        if key in self._blocks:
+            blocks = self._blocks[key]
+            start_row = np.concatenate([blocks[0], start_row])
+            stop_row = np.concatenate([blocks[1], stop_row])
+            start_time = blocks[2].append(start_time)
+            end_time = blocks[3].append(end_time)
+        
+        self._blocks[key] = self._merge(start_row, stop_row, start_time, end_time)
+
+    def _merge(self, start_row, stop_row, start_time, end_time):
+        order = np.argsort(start_row, kind='stable')
+        start_row = start_row[order]
+        stop_row = stop_row[order]
+        
+        # Running max of the stop row, and the block that sets it
+        max_stop_row = np.maximum.accumulate(stop_row)
+        nblocks = len(start_row)
+        max_block = np.maximum.accumulate(np.where(stop_row == max_stop_row, 
+                                                   np.arange(nblocks), 0))
+        
+        new = np.ones(nblocks, dtype=bool)
+        new[1:] = start_row[1:] > max_stop_row[:-1] + 1
+        first = np.flatnonzero(new)
+        last = np.append(first[1:] - 1, nblocks - 1)
+        
+        return (start_row[first], max_stop_row[last], 
+                start_time[order[first]], end_time[order[max_block[last]]])
+
+    def blocks(self, key, min_failures=1):
+        """
+        Return merged blocks (start row, stop row, start time, end time) 
+        with at least min_failures timesteps
+        """
+        start_row, stop_row, start_time, end_time = self._blocks[key]
+        keep = (stop_row - start_row + 1) >= min_failures
+        
+        return start_row[keep], stop_row[keep], start_time[keep], end_time[keep]
+
+    def pop(self, key, min_failures=1, row=None):
+        """
+        Remove and return merged blocks that are closed, blocks are closed 
+        if they can not be extended by blocks that start at or after row.  
+        If row is None, all blocks are closed.
+        """
+        if row is None:
+            blocks = self.blocks(key, min_failures)
+            del self._blocks[key]
+            return blocks
+        
+        start_row, stop_row, start_time, end_time = self._blocks[key]
+        closed = stop_row < row - 1
+        self._blocks[key] = (start_row[~closed], stop_row[~closed], 
+                             start_time[~closed], end_time[~closed])
+        if closed.all():
+            del self._blocks[key]
+        keep = closed & ((stop_row - start_row + 1) >= min_failures)
+        
+        return start_row[keep], stop_row[keep], start_time[keep], end_time[keep]
+
+class _ChunkedRun(object):
+    """
+    State used to run a quality control plan one time slice at a time, 
+    includes the halo from the previous time slice and failure blocks that 
+    can be extended by the next time slice.
+    """
+
+    def __init__(self, plan, pm):
+        self.plan = plan
+        self.pm = pm
+        
+        # Halo size
+        window = 0
+        increment = 1
+        for test, _, options in plan.steps:
+            if test == 'Outlier':
+                assert not options['streaming'], 'streaming outlier tests can not be run on time slices'
+                assert options['window'] is not None, 'outlier tests run on time slices require a window'
+            if test in ['Delta', 'Outlier']:
+                window = max(window, options['window'])
+            elif test == 'Increment':
+                increment = max(increment, options['increment'])
+        self.window = pd.Timedelta(str(int(window*1e3)) + 'ms') # milliseconds
+        self.increment = increment
+        
+        self.stitcher = _BlockStitcher()
+        self.halo = None
+        self.nrows = 0 # number of rows in previous time slices
+        self.provisional_rows = None # buffer rows (start, stop) of provisional test results
+
+    @property
+    def halo_row(self):
+        """
+        Global row position of the first row in the halo
+        """
+        if self.halo is None:
+            return self.nrows
+        return self.nrows - self.halo.shape[0]
+
+    def add(self, df):
+        """
+        Run the plan on a time slice of data, failure blocks are stored in 
+        the stitcher
+        """
+        assert isinstance(df, pd.DataFrame), 'data must contain pd.DataFrames'
+        assert isinstance(df.index, pd.DatetimeIndex), 'data.index must be a DatetimeIndex'
+        if df.empty:
+            return
+        offset = self.halo_row
+        nhalo = 0
+        if self.halo is not None:
+            assert df.index[0] > self.halo.index[-1], 'time slices must be consecutive and can not overlap'
+            nhalo = self.halo.shape[0]
+            df = pd.concat([self.halo, df])
+        
+        pm = self.pm
+        chunk_pm = PerformanceMonitoring()
+        chunk_pm.df = df
+        chunk_pm.trans = dict([(col, [col]) for col in df.columns])
+        chunk_pm.trans.update(pm.trans)
+        if not pm.tfilter.empty:
+            chunk_pm.tfilter = pm.tfilter.reindex(df.index, fill_value=True)
+        
+        chunks = self.plan._run(chunk_pm, range(len(self.plan.steps)), min_failures=1)
+        
+        buffer = chunk_pm._test_results_buffer
+        for i, (first_chunk, last_chunk) in chunks.items():
+            if first_chunk == last_chunk:
+                continue
+            step_buffer = _TestResultsBuffer()
+            step_buffer.extend(buffer, first_chunk, last_chunk)
+            test_results = step_buffer.to_dataframe()
+            start_time = pd.DatetimeIndex(test_results['Start Time'])
+            end_time = pd.DatetimeIndex(test_results['End Time'])
+            start_row = offset + df.index.get_indexer(start_time)
+            stop_row = offset + df.index.get_indexer(end_time)
+            if self.plan.steps[i][0] != 'Delta' and nhalo > 0:
+                # Rows in the halo were tested with the previous time slice 
+                # (outlier windows for rows in the halo are incomplete).  
+                # Delta tests keep the halo, failures in the new data can 
+                # flag the time span back into the halo.
+                first_row = offset + nhalo
+                test_results = test_results[stop_row >= first_row]
+                start_row = np.maximum(start_row, first_row)
+                start_time = df.index[start_row - offset]
+            for (flag, variable), group in test_results.groupby(['Error Flag', 'Variable Name'], sort=False):
+                rows = group.index.values
+                self.stitcher.add((i, flag, variable), start_row[rows], 
+                                  stop_row[rows], start_time[rows], end_time[rows])
+        
+        # The halo covers the largest window (plus one row, so the 
+        # first window that is set to NaN in delta tests is in the halo) 
+        # and largest increment
+        nhalo = (df.index >= df.index[-1] - self.window).sum() + 1
+        nhalo = min(max(nhalo, self.increment), df.shape[0])
+        self.halo = df.iloc[-nhalo:]
+        self.nrows = offset + df.shape[0]
+
+    def append_test_results(self, row=None, keep=False):
+        """
+        Append stitched test results to the PerformanceMonitoring object, in 
+        the same order as running the plan on the entire data set (by step, 
+        lower then upper bound, column order, and time).  Blocks that can be 
+        extended by blocks that start at or after row are not appended (if 
+        row is None, all blocks are appended).  Appended blocks are removed 
+        from the stitcher, unless keep is True.
+        """
+        pm = self.pm
+        keys = self.stitcher.keys()
+        for i, (_, key, options) in enumerate(self.plan.steps):
+            step_keys = [k for k in keys if k[0] == i]
+            columns = pm.trans.get(key, [key])
+            step_keys.sort(key=lambda k: (' > upper bound' in k[1], columns.index(k[2])))
+            for k in step_keys:
+                if keep:
+                    blocks = self.stitcher.blocks(k, options['min_failures'])
+                else:
+                    blocks = self.stitcher.pop(k, options['min_failures'], row)
+                start_row, stop_row, start_time, end_time = blocks
+                pm._update_version()
+                pm._test_results_buffer.append(k[2], start_time, end_time, 
+                                               stop_row - start_row + 1, k[1])
+
+class QCPlan(object):
+    """
+    Quality control plan, a set of range, increment, delta, and outlier 
+    tests defined in a configuration dictionary (e.g. loaded from a YAML 
+    configuration file).  When the plan is run, tests that use the same 
+    intermediate data (increments, rolling min/max, or rolling mean/std) 
+    share a single computation across all data columns in the plan.  
+    Test results are the same as calling each PerformanceMonitoring method 
+    in the order the tests are listed in the configuration.
+    
+    Parameters
+    ----------
+    config : dictionary
+        Quality control tests, using the keys 'Range', 'Increment', 'Delta', 
+        and 'Outlier'.  Each test maps a data column name or translation 
+        dictionary key to a bound, [lower bound, upper bound], or to a 
+        dictionary of keyword arguments used in the corresponding 
+        PerformanceMonitoring method, for example 
+        {'bound': [None, 0.6], 'increment': 2}.  Other keys in the 
+        configuration (e.g. 'Translation') are ignored.
+    
+    window : int or float, optional
+        Size of the rolling window (in seconds) used in delta and outlier 
+        tests that do not specify a window, default = None
+    """
+    
+    # Options (and default values) for each test
+    options = {
+        'Range': {'min_failures': 1},
+        'Increment': {'increment': 1, 'absolute_value': True, 'min_failures': 1},
+        'Delta': {'window': None, 'direction': None, 'min_failures': 1},
+        'Outlier': {'window': None, 'absolute_value': False, 'streaming': False, 
+                    'min_failures': 1}}
+    
+    def __init__(self, config, window=None):
+        assert isinstance(config, dict), 'config must be of type dictionary'
+        assert isinstance(window, (NoneType, int, float)), 'window must be None or of type int or float'
+        
+        # List of (test, key, options)
+        self.steps = []
+        
+        for test, entries in config.items():
+            if test not in self.options:
+                continue
+            for key, value in entries.items():
+                options = dict(self.options[test])
+                if 'window' in options:
+                    options['window'] = window
+                if isinstance(value, dict):
+                    assert 'bound' in value, test + ' ' + str(key) + ' must include a bound'
+                    unknown = set(value.keys()) - set(options.keys()) - set(['bound'])
+                    assert len(unknown) == 0, 'unknown options for ' + test + ': ' + str(sorted(unknown))
+                    options.update(value)
+                else:
+                    options['bound'] = value
+                    
+                assert isinstance(options['bound'], list), 'bound must be of type list'
+                if test == 'Delta':
+                    assert options['window'] is not None, 'Delta ' + str(key) + ' requires a window'
+                
+                self.steps.append((test, key, options))
+    
+    def _group(self, test, options):
+        """
+        Tests in the same group share intermediate data
+        """
+        if test == 'Increment':
+            return (test, options['increment'])
+        elif test == 'Delta':
+            return (test, options['window'])
+        elif test == 'Outlier' and not options['streaming']:
+            return (test, options['window'])
+        return None
+
+    def _shards(self, pm, workers, shard_size):
+        """
+        Group test steps into shards, each translation key is assigned to 
+        a single shard.  Returns a list of step indices for each shard. 
+        Streaming tests and undefined keys are not included.
+        """
+        keys = []
+        key_steps = {}
+        for i, (test, key, options) in enumerate(self.steps):
+            if test == 'Outlier' and options['streaming']:
+                continue
+            columns = pm.trans.get(key, None)
+            if (columns is None) or (not set(columns).issubset(pm.df.columns)):
+                continue
+            if key not in key_steps:
+                keys.append(key)
+                key_steps[key] = []
+            key_steps[key].append(i)
+        
+        if shard_size is None:
+            ncols = sum([len(pm.trans[key]) for key in keys])
+            shard_size = max(int(np.ceil(ncols/float(workers))), 1)
+        
+        shards = []
+        shard = []
+        ncols = 0
+        for key in keys:
+            if (len(shard) > 0) and (ncols + len(pm.trans[key]) > shard_size):
+                shards.append(shard)
+                shard = []
+                ncols = 0
+            shard.append(key)
+            ncols = ncols + len(pm.trans[key])
+        if len(shard) > 0:
+            shards.append(shard)
+        
+        return [sorted([i for key in shard for i in key_steps[key]]) for shard in shards]
+
+    def run(self, pm, workers=1, shard_size=None, executor='thread'):
+        """
+        Run the quality control plan, results are appended to the test 
+        results in the PerformanceMonitoring object
+        
+        Parameters
+        ----------
+        pm : PerformanceMonitoring object
+            Performance monitoring object with data, translation dictionary, 
+            and time filter
+        
+        workers : int, optional
+            Number of workers used to run the tests, default = 1.  
+            When workers is greater than 1 (or shard_size is specified), data 
+            columns are split into shards which are run in parallel.  Each 
+            translation key is assigned to a single shard.  Test results are 
+            identical to running the plan with a single worker.
+        
+        shard_size : int, optional
+            Maximum number of data columns in each shard (a translation key 
+            with more columns is assigned its own shard).  If not specified, 
+            columns are split evenly between workers.
+        
+        executor : str, optional
+            Options = 'thread' or 'process', default = 'thread'.  
+            Processes avoid the global interpreter lock, but data is copied 
+            to each process.
+        """
+        assert isinstance(pm, PerformanceMonitoring), 'pm must be of type PerformanceMonitoring'
+        assert isinstance(workers, int) and (workers >= 1), 'workers must be an int >= 1'
+        assert isinstance(shard_size, (NoneType, int)), 'shard_size must be None or of type int'
+        assert executor in ['thread', 'process'], "executor must be the string 'thread' or 'process'"
+        
+        logger.info("Run quality control plan")
+        
+        if pm.df.empty:
+            logger.info("Empty database")
+            return
+        
+        if (workers == 1) and (shard_size is None):
+            self._run(pm, range(len(self.steps)))
+            return
+        
+        shards = self._shards(pm, workers, shard_size)
+        
+        if executor == 'thread':
+            pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        else:
+            pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        
+        with pool:
+            futures = []
+            for step_ids in shards:
+                columns = []
+                for i in step_ids:
+                    for col in pm.trans[self.steps[i][1]]:
+                        if col not in columns:
+                            columns.append(col)
+                trans = dict([(self.steps[i][1], pm.trans[self.steps[i][1]]) for i in step_ids])
+                futures.append(pool.submit(_run_plan_shard, self, step_ids, 
+                                           pm.df[columns], trans, pm.tfilter))
+            results = [future.result() for future in futures]
+        
+        # Merge results in the order tests are listed in the plan
+        shard_results = {}
+        for buffer, chunks in results:
+            for i, (first_chunk, last_chunk) in chunks.items():
+                shard_results[i] = (buffer, first_chunk, last_chunk)
+        
+        for i in range(len(self.steps)):
+            if i in shard_results:
+                pm._update_version()
+                pm._test_results_buffer.extend(*shard_results[i])
+            else:
+                self._run(pm, [i])
+
+    def run_chunked(self, pm, data):
+        """
+        Run the quality control plan on consecutive time slices of data, 
+        results are appended to the test results in the PerformanceMonitoring 
+        object.  Data does not need to be stored in the PerformanceMonitoring 
+        object, so memory is bounded by the size of each time slice.
+        
+        Each time slice is combined with a halo from the end of the previous 
+        time slice, sized to the largest delta or outlier window and 
+        increment in the plan.  Failures that span time slices are stitched 
+        into a single test result and min_failures is applied after 
+        stitching, so test results are the same as running the plan on 
+        the entire data set.
+        
+        Parameters
+        ----------
+        pm : PerformanceMonitoring object
+            Performance monitoring object with translation dictionary and 
+            time filter (which should cover each time slice)
+        
+        data : iterable of pandas DataFrames
+            Consecutive time slices of data, indexed by datetime, that do not 
+            overlap (for example, data read one file at a time).  Each 
+            index must be monotonically increasing.
+        """
+        assert isinstance(pm, PerformanceMonitoring), 'pm must be of type PerformanceMonitoring'
+        
+        logger.info("Run quality control plan on time slices")
+        
+        state = _ChunkedRun(self, pm)
+        for df in data:
+            state.add(df)
+        state.append_test_results()
+
+    def run_incremental(self, pm, data):
+        """
+        Run the quality control plan on new data, appended after data from 
+        previous calls to run_incremental with the same plan and 
+        PerformanceMonitoring object.  Only the new data (and a halo of 
+        previous data, sized to the largest window and increment in the plan) 
+        is processed, so the cost of each update is proportional to the size 
+        of the new data.  The data is not stored in the PerformanceMonitoring 
+        object.
+        
+        Failures that are still open at the end of the data (they could be 
+        extended by the next update) are appended as provisional test 
+        results, which are replaced by the next update.  Test results are 
+        appended in the order failures are closed.
+        
+        Parameters
+        ----------
+        pm : PerformanceMonitoring object
+            Performance monitoring object with translation dictionary and 
+            time filter (which should cover the new data)
+        
+        data : pandas DataFrame
+            New data, indexed by datetime.  The index must be monotonically 
+            increasing and start after data from the previous update.
+        """
+        assert isinstance(pm, PerformanceMonitoring), 'pm must be of type PerformanceMonitoring'
+        
+        logger.info("Run quality control plan on new data")
+        
+        if self not in pm._plan_states:
+            pm._plan_states[self] = _ChunkedRun(self, pm)
+        state = pm._plan_states[self]
+        
+        # Remove provisional test results from the previous update
+        if state.provisional_rows is not None:
+            pm._remove_test_results(*state.provisional_rows)
+        
+        state.add(data)
+        state.append_test_results(row=state.halo_row)
+        start = len(pm._test_results_buffer)
+        state.append_test_results(keep=True)
+        state.provisional_rows = (start, len(pm._test_results_buffer))
+
+    def _run(self, pm, step_ids, min_failures=None):
+        """
+        Run test steps, returns the range of test results buffer chunks 
+        appended by each step.  If min_failures is not None, it overrides 
+        min_failures in each step.
+        """
+        # Data columns used in each test, and in each group of tests that 
+        # share intermediate data
+        steps = []
+        group_columns = {}
+        for i in step_ids:
+            test, key, options = self.steps[i]
+            columns = pm.trans.get(key, None)
+            if (columns is None) or (not set(columns).issubset(pm.df.columns)):
+                logger.warning("Undefined key: " + str(key))
+                continue
+            group = self._group(test, options)
+            if group is not None:
+                group_columns.setdefault(group, [])
+                for col in columns:
+                    if col not in group_columns[group]:
+                        group_columns[group].append(col)
+            steps.append((i, test, key, options, columns, group))
+        
+        # Shared intermediate data, computed once for each group
+        intermediate = {}
+        for group, columns in group_columns.items():
+            df = pm.df[columns]
+            if group[0] == 'Increment':
+                intermediate[group] = df.diff(periods=group[1])
+            elif group[0] == 'Delta':
+                assert pm.df.index.is_monotonic_increasing, 'index must be monotonically increasing'
+                window_str = str(int(group[1]*1e3)) + 'ms' # milliseconds
+                intermediate[group] = _rolling_delta(df, window_str)
+            elif group[0] == 'Outlier':
+                assert pm.df.index.is_monotonic_increasing, 'index must be monotonically increasing'
+                intermediate[group] = _normalize(df, group[1])
+        
+        chunks = {}
+        for i, test, key, options, columns, group in steps:
+            first_chunk = len(pm._test_results_buffer._chunks)
+            bound = options['bound']
+            if min_failures is None:
+                step_min_failures = options['min_failures']
+            else:
+                step_min_failures = min_failures
+            df = pm.df[columns]
+            
+            if test == 'Range':
+                pm._generate_test_results(df, bound, step_min_failures, 'Data')
+                
+            elif test == 'Increment':
+                if df.isnull().all().all():
+                    logger.warning("Check increment range failed (all data is Null): " + str(key))
+                else:
+                    df = intermediate[group][columns]
+                    if options['absolute_value']:
+                        df = np.abs(df)
+                        error_prefix = '|Increment|'
+                    else:
+                        error_prefix = 'Increment'
+                    pm._generate_test_results(df, bound, step_min_failures, error_prefix)
+                
+            elif test == 'Delta':
+                window_str = str(int(options['window']*1e3)) + 'ms' # milliseconds
+                pm._delta_test_results(df, intermediate[group][columns], bound, 
+                                       window_str, options['direction'], 
+                                       step_min_failures)
+                
+            elif test == 'Outlier':
+                if options['streaming']:
+                    # Streaming tests depend on previous results and are run 
+                    # individually
+                    pm.check_outlier(bound, options['window'], key, 
+                                     options['absolute_value'], True, 
+                                     step_min_failures)
+                else:
+                    df = intermediate[group][columns]
+                    if options['absolute_value']:
+                        df = np.abs(df)
+                        error_prefix = '|Outlier|'
+                    else:
+                        error_prefix = 'Outlier'
+                    pm._generate_test_results(df, bound, step_min_failures, error_prefix)
+            
+            chunks[i] = (first_chunk, len(pm._test_results_buffer._chunks))
+        
+        return chunks
+
+def _run_plan_shard(plan, step_ids, df, trans, tfilter):
+    """
+    Run test steps from a quality control plan on a subset of data columns, 
+    returns the test results buffer and the range of chunks for each step
+    """
+    pm = PerformanceMonitoring()
+    pm.df = df
+    pm.trans = trans
+    pm.tfilter = tfilter
+    
+    chunks = plan._run(pm, step_ids)
+    
+    return pm._test_results_buffer, chunks
+
 ### Functional approach
 @_documented_by(PerformanceMonitoring.check_timestamp)
 def check_timestamp(data, frequency, expected_start_time=None,
-                    expected_end_time=None, min_failures=1, exact_times=True):
+                    expected_end_time=None, min_failures=1, exact_times=True,
+                    reindex=True):
 
     pm = PerformanceMonitoring()
     pm.add_dataframe(data)
     pm.check_timestamp(frequency, expected_start_time, expected_end_time,
-                       min_failures, exact_times)
+                       min_failures, exact_times, reindex)
     mask = pm.mask
 
     return {'cleaned_data': pm.data, 'mask': mask, 'test_results': pm.test_results}
@@ -945,11 +3356,11 @@ def check_delta(data, bound, window, key=None, direction=None, min_failures=1):
 
 @_documented_by(PerformanceMonitoring.check_outlier)
 def check_outlier(data, bound, window=None, key=None, absolute_value=False, 
-                  streaming=False, min_failures=1):
+                  streaming=False, min_failures=1, history=None):
 
     pm = PerformanceMonitoring()
     pm.add_dataframe(data)
-    pm.check_outlier(bound, window, key, absolute_value, streaming, min_failures)
+    pm.check_outlier(bound, window, key, absolute_value, streaming, min_failures, history)
     mask = pm.mask
 
     return {'cleaned_data': data[mask], 'mask': mask, 'test_results': pm.test_results}
@@ -990,11 +3401,12 @@ def check_custom_static(data, quality_control_func, key=None, min_failures=1,
 
 @_documented_by(PerformanceMonitoring.check_custom_streaming, include_metadata=True)
 def check_custom_streaming(data, quality_control_func, window, key=None, rebase=None,
-                         min_failures=1, error_message=None):
+                         min_failures=1, error_message=None, raw=False, 
+                         block_size=None, history=None):
 
     pm = PerformanceMonitoring()
     pm.add_dataframe(data)
-    metadata = pm.check_custom_streaming(quality_control_func, window, key, rebase, min_failures, error_message)
+    metadata = pm.check_custom_streaming(quality_control_func, window, key, rebase, min_failures, error_message, raw, block_size, history)
     mask = pm.mask
 
     return {'cleaned_data': data[mask], 'mask': mask, 'test_results': pm.test_results,
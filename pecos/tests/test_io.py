@@ -20,6 +20,12 @@ class TestIO(unittest.TestCase):
         
         df = pecos.io.read_campbell_scientific(file_name, 'TIMESTAMP')
         self.assertEqual((48,11), df.shape)
+        
+        df = pecos.io.read_campbell_scientific(file_name, 'TIMESTAMP', dtype='float32')
+        self.assertTrue((df.dtypes == 'float32').all())
+        
+        self.assertRaises(AssertionError, pecos.io.read_campbell_scientific, 
+                          file_name, 'TIMESTAMP', dtype='int64')
     
     def test_write_metrics1(self):
         filename = abspath(join(testdir, 'metrics.csv'))
@@ -1,5 +1,5 @@
 import unittest
-from pandas.testing import assert_frame_equal
+from pandas.testing import assert_frame_equal, assert_series_equal
 from os.path import abspath, dirname, join
 import numpy as np
 import pandas as pd
@@ -149,6 +149,12 @@ class TestMetrics(unittest.TestCase):
         
         self.assertEqual((mask == expected_mask).any().any(), True)
         self.assertEqual(QCI.mean(), (15-5)/15.0)
+
+        # Compact mask
+        assert_series_equal(pecos.metrics.qci(pm.compact_mask), QCI)
+        tfilter = pd.Series([True, True, True, False, False], index=pm.df.index)
+        assert_series_equal(pecos.metrics.qci(pm.compact_mask, tfilter), 
+                            pecos.metrics.qci(mask, tfilter))
     
         tfilter = pd.Series(data = [True, False, True, True, True], index=pm.df.index)
         QCI_with_tfilter = pecos.metrics.qci(mask, tfilter = tfilter)
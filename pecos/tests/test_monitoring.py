@@ -1,5 +1,7 @@
 import unittest
+import copy
 from pandas.testing import assert_frame_equal, assert_series_equal
+from numpy.testing import assert_array_equal
 from os.path import abspath, dirname, join
 import pandas as pd
 import numpy as np
@@ -72,7 +74,7 @@ class Test_simple_example(unittest.TestCase):
 
     @classmethod
     def setUp(self):
-        trans = {
+        self.trans = {
             'Linear': ['A'],
             'Random': ['B'],
             'Wave': ['C','D']}
@@ -80,15 +82,25 @@ class Test_simple_example(unittest.TestCase):
         file_name = join(simpleexampledir,'simple.csv')
 
         self.raw_data = pd.read_csv(file_name, index_col=0, parse_dates=True)
-        self.pm = pecos.monitoring.PerformanceMonitoring()
-        self.pm.add_dataframe(self.raw_data)
-        self.pm.add_translation_dictionary(trans)
-        self.pm.check_timestamp(900)
+        self.pm = self._setup_pm(time_filter=False)
         clocktime = pecos.utils.datetime_to_clocktime(self.pm.df.index)
         time_filter = (clocktime > 3*3600) & (clocktime < 21*3600)
         self.time_filter = pd.Series(time_filter, index=self.pm.df.index)
         self.pm.add_time_filter(self.time_filter)
 
+    @classmethod
+    def _setup_pm(self, time_filter=True):
+        # PerformanceMonitoring object with the raw data, translation 
+        # dictionary, timestamp test results and time filter
+        pm = pecos.monitoring.PerformanceMonitoring()
+        pm.add_dataframe(self.raw_data)
+        pm.add_translation_dictionary(self.trans)
+        pm.check_timestamp(900)
+        if time_filter:
+            pm.add_time_filter(self.time_filter)
+        
+        return pm
+
     @classmethod
     def tearDown(self):
         pass
@@ -135,9 +147,13 @@ class Test_simple_example(unittest.TestCase):
             columns=['Variable Name', 'Start Time', 'End Time', 'Timesteps', 'Error Flag'])
         
         # Object-oriented test
+        A = self.pm.df['A'].values
         self.pm.check_corrupt([-999])
         test_results = self.pm.test_results[self.pm.test_results['Error Flag'] == 'Corrupt data']
         assert_frame_equal(test_results.reset_index(drop=True), expected, check_dtype=False)
+        self.assertTrue(self.pm.df.loc['2015-01-01 07:30:00':'2015-01-01 09:30:00', 'C'].isnull().all())
+        # Columns without corrupt data are not copied
+        self.assertTrue(np.shares_memory(self.pm.df['A'].values, A))
         
         # Functional test
         results = pecos.monitoring.check_corrupt(self.raw_data, [-999])
@@ -263,6 +279,119 @@ class Test_simple_example(unittest.TestCase):
 
         assert_frame_equal(temp, expected, check_dtype=False, check_index_type=False)
 
+    def test_add_dataframe_columns(self):
+        df = self.pm.df
+        expected = df.copy()
+        for i, col in enumerate(['E', 'F', 'Wave Error']):
+            data = pd.DataFrame({col: df['A']*i}, index=df.index)
+            expected = data.combine_first(expected)
+            self.pm.add_dataframe(data)
+        
+        assert_frame_equal(self.pm.df, expected)
+        self.assertEqual(self.pm.trans['Wave Error'], ['Wave Error'])
+        # Existing data is not copied
+        self.assertTrue(np.shares_memory(self.pm.df['A'].values, df['A'].values))
+        
+        # Data with a different index is aligned
+        data = pd.DataFrame({'G': [1.0]}, index=df.index[[2]])
+        expected = data.combine_first(expected)
+        self.pm.add_dataframe(data)
+        assert_frame_equal(self.pm.df, expected)
+
+    def test_float32(self):
+        pm = pecos.monitoring.PerformanceMonitoring(dtype='float32')
+        pm.add_dataframe(self.raw_data)
+        pm.add_translation_dictionary(self.pm.trans)
+        pm.check_timestamp(900)
+        self.assertTrue((pm.df.dtypes == 'float32').all())
+        
+        expected = pecos.monitoring.PerformanceMonitoring()
+        expected.add_dataframe(self.raw_data.astype('float32').astype('float64'))
+        expected.add_translation_dictionary(self.pm.trans)
+        expected.check_timestamp(900)
+        
+        for p in [pm, expected]:
+            p.check_corrupt([-999])
+            p.check_range([None, 1], 'Random')
+            p.check_delta([0.0001, None], window=3600, key='Wave')
+            p.check_outlier([-3, 3], window=12*3600, key='Wave', streaming=True)
+        
+        assert_frame_equal(pm.test_results, expected.test_results)
+        self.assertTrue((pm.cleaned_data.dtypes == 'float32').all())
+        assert_frame_equal(pm.cleaned_data, expected.cleaned_data.astype('float32'))
+        
+        self.assertRaises(AssertionError, pecos.monitoring.PerformanceMonitoring, dtype='int64')
+
+    def test_compress_time_filter(self):
+        expected = self._setup_pm()
+        
+        self.pm.add_time_filter(self.time_filter, compress=True)
+        
+        for pm in [self.pm, expected]:
+            pm.check_range([None, 1], 'Random')
+            pm.check_range([0.2, 0.8], min_failures=2)
+            pm.check_increment([0.0001, 0.5], increment=2)
+            pm.check_missing()
+        
+        assert_frame_equal(self.pm.test_results, expected.test_results)
+        assert_frame_equal(self.pm.mask, expected.mask)
+
+    def test_bounds_dict(self):
+        bounds = {'Random': [None, 1], 'Wave': [-0.8, 0.8], 'C': [0, None]}
+        expected = self._setup_pm()
+        integer_bounds = {'Random': [0, 1], 'Wave': [-1, 1]}
+        for b in [bounds, integer_bounds]:
+            for key, bound in b.items():
+                expected.check_range(bound, key)
+            for key, bound in b.items():
+                expected.check_increment(bound, key, increment=2)
+        
+        self.pm.check_range(bounds)
+        self.pm.check_increment(pd.DataFrame.from_dict(bounds, orient='index'), 
+                                increment=2)
+        # Integer bounds are stored as float in a DataFrame with missing bounds
+        integer_bounds = pd.DataFrame({'lower': [0, -1, None], 'upper': [1, 1, None]}, 
+                                      index=['Random', 'Wave', 'Linear'])
+        self.pm.check_range(integer_bounds)
+        self.pm.check_increment(integer_bounds, increment=2)
+        
+        assert_frame_equal(self.pm.test_results, expected.test_results)
+        assert_frame_equal(self.pm.mask, expected.mask)
+
+    def test_time_varying_bounds(self):
+        expected = self._setup_pm()
+        expected.check_range([None, 1], 'Random')
+        expected.check_range([-0.8, None], 'C')
+        expected.check_increment([None, 0.5], 'Wave')
+        
+        index = self.pm.df.index
+        upper = pd.Series(1.0, index=index, name='1')
+        self.pm.check_range([None, upper], 'Random')
+        # NaN = no bound
+        lower = pd.DataFrame({'C': -0.8, 'D': np.nan}, index=index[::-1])
+        self.pm.check_range([lower, None], 'Wave')
+        upper = pd.Series(0.5, index=index, name='0.5')
+        self.pm.check_increment([None, upper], 'Wave')
+        
+        test_results = self.pm.test_results
+        test_results.loc[test_results['Error Flag'] == 'Data < lower bound, time-varying', 
+                         'Error Flag'] = 'Data < lower bound, -0.8'
+        assert_frame_equal(test_results, expected.test_results)
+
+    def test_lower_and_upper_bound(self):
+        # Lower and upper bound failures are evaluated together, including 
+        # bounds where the lower bound is greater than the upper bound
+        expected = self._setup_pm()
+        for bound in [[0.3, 0.7], [0.6, 0.4]]:
+            expected.check_range([bound[0], None], min_failures=2)
+            expected.check_range([None, bound[1]], min_failures=2)
+        
+        for bound in [[0.3, 0.7], [0.6, 0.4]]:
+            self.pm.check_range(bound, min_failures=2)
+        
+        assert_frame_equal(self.pm.test_results, expected.test_results)
+        assert_frame_equal(self.pm.mask, expected.mask)
+
     def test_full_example(self):
         data_file = join(simpleexampledir,'simple.csv')
         df = pd.read_csv(data_file, index_col=0, parse_dates=True)
@@ -283,6 +412,145 @@ class Test_simple_example(unittest.TestCase):
         
         assert_frame_equal(actual, expected, check_dtype=False)
     
+    def test_qc_plan(self):
+        config = {
+            'Translation': {'Wave': ['C','D']},
+            'Range': {'B': [0, 1], 'Wave': [-1, 1]},
+            'Delta': {'A': [0.0001, None], 'B': [0.0001, None], 
+                      'Wave': {'bound': [None, 0.9], 'direction': 'positive'}},
+            'Increment': {'Wave': [None, 0.6], 
+                          'Linear': {'bound': [-0.1, None], 'absolute_value': False}},
+            'Outlier': {'Wave': {'bound': [-2, 2], 'window': 7200}, 
+                        'B': [None, 2], 'E': [None, 2]}}
+        
+        # Expected results, one test at a time
+        pm = copy.deepcopy(self.pm)
+        for key, value in config['Range'].items():
+            pm.check_range(value, key)
+        pm.check_delta([0.0001, None], 3600, 'A')
+        pm.check_delta([0.0001, None], 3600, 'B')
+        pm.check_delta([None, 0.9], 3600, 'Wave', direction='positive')
+        pm.check_increment([None, 0.6], 'Wave')
+        pm.check_increment([-0.1, None], 'Linear', absolute_value=False)
+        pm.check_outlier([-2, 2], 7200, 'Wave')
+        pm.check_outlier([None, 2], 3600, 'B')
+        
+        plan = pecos.monitoring.QCPlan(config, window=3600)
+        self.assertEqual(len(plan.steps), 10)
+        
+        # Parallel execution, data columns are split into shards
+        pm_parallel = copy.deepcopy(self.pm)
+        plan.run(pm_parallel, workers=2)
+        assert_frame_equal(pm_parallel.test_results, pm.test_results)
+        
+        pm_parallel = copy.deepcopy(self.pm)
+        plan.run(pm_parallel, workers=2, shard_size=1, executor='process')
+        assert_frame_equal(pm_parallel.test_results, pm.test_results)
+        assert_frame_equal(pm_parallel.mask, pm.mask)
+        
+        plan.run(self.pm)
+        assert_frame_equal(self.pm.test_results, pm.test_results)
+
+    def test_qc_plan_chunked(self):
+        config = {
+            'Range': {'B': [0, 1], 'Wave': {'bound': [-1, 1], 'min_failures': 3}},
+            'Delta': {'A': [0.0001, None], 'B': [0.0001, None], 
+                      'Wave': {'bound': [None, 0.9], 'direction': 'positive'}},
+            'Increment': {'Wave': {'bound': [None, 0.6], 'increment': 2}},
+            'Outlier': {'Wave': {'bound': [-2, 2], 'window': 7200}}}
+        self.pm.add_translation_dictionary({'Wave': ['C','D']})
+        
+        plan = pecos.monitoring.QCPlan(config, window=3600)
+        
+        pm = copy.deepcopy(self.pm)
+        plan.run(pm)
+        
+        # Time slices of data, failures span several time slices
+        pm_chunked = copy.deepcopy(self.pm)
+        data = [self.pm.df.iloc[i:i+13] for i in range(0, self.pm.df.shape[0], 13)]
+        plan.run_chunked(pm_chunked, data)
+        
+        assert_frame_equal(pm_chunked.test_results, pm.test_results)
+        
+        # Incremental updates
+        pm_incremental = copy.deepcopy(self.pm)
+        self._check_incremental(plan, pm_incremental, data, pm.test_results)
+    
+    def test_qc_plan_chunked_outlier(self):
+        # Random walk with outliers close to the edges of the time slices
+        np.random.seed(2837)
+        index = pd.date_range('1/1/2020', periods=2000, freq='Min')
+        df = pd.DataFrame(np.cumsum(np.random.normal(size=(2000, 2)), axis=0), 
+                          index=index, columns=['A', 'B'])
+        config = {
+            'Range': {'A': [-20, 20]},
+            'Delta': {'A': [None, 8]},
+            'Increment': {'B': {'bound': [None, 1.5], 'increment': 2}},
+            'Outlier': {'A': {'bound': [-2, 2], 'window': 3600}, 
+                        'B': {'bound': [-1.5, 1.5], 'window': 1800, 'min_failures': 2}}}
+        plan = pecos.monitoring.QCPlan(config, window=3600)
+        
+        pm = pecos.monitoring.PerformanceMonitoring()
+        pm.add_dataframe(df)
+        plan.run(pm)
+        
+        data = [df.iloc[i:i+300] for i in range(0, df.shape[0], 300)]
+        pm_chunked = pecos.monitoring.PerformanceMonitoring()
+        plan.run_chunked(pm_chunked, data)
+        assert_frame_equal(pm_chunked.test_results, pm.test_results)
+        
+        pm_incremental = pecos.monitoring.PerformanceMonitoring()
+        self._check_incremental(plan, pm_incremental, data, pm.test_results)
+    
+    def test_qc_plan_incremental_shared(self):
+        # Two plans updated in turn and quality control tests run directly 
+        # between updates, no test results are removed
+        plan1 = pecos.monitoring.QCPlan({
+            'Range': {'Wave': [-1, 1]},
+            'Increment': {'Wave': {'bound': [None, 0.6], 'increment': 2}}})
+        plan2 = pecos.monitoring.QCPlan({
+            'Delta': {'B': [0.0001, None]},
+            'Outlier': {'Wave': {'bound': [-2, 2], 'window': 7200}}}, window=3600)
+        self.pm.add_translation_dictionary({'Wave': ['C','D']})
+        
+        expected = copy.deepcopy(self.pm)
+        plan1.run(expected)
+        plan2.run(expected)
+        expected.check_range([None, 0.9], 'Random')
+        expected.check_missing()
+        
+        pm = copy.deepcopy(self.pm)
+        data = [self.pm.df.iloc[i:i+13] for i in range(0, self.pm.df.shape[0], 13)]
+        for i, df in enumerate(data):
+            plan1.run_incremental(pm, df)
+            if i == 2:
+                pm.check_range([None, 0.9], 'Random')
+            plan2.run_incremental(pm, df)
+            if i == 4:
+                pm.check_missing()
+        
+        columns = list(expected.test_results.columns)
+        assert_frame_equal(
+            pm.test_results.sort_values(columns).reset_index(drop=True), 
+            expected.test_results.sort_values(columns).reset_index(drop=True))
+    
+    def _check_incremental(self, plan, pm, data, expected):
+        # Test results are appended in the order failures are closed, test 
+        # results closed by the same update (and the final provisional test 
+        # results) are in the same order as expected
+        closed = [0]
+        for df in data:
+            plan.run_incremental(pm, df)
+            closed.append(pm._plan_states[plan].provisional_rows[0])
+        closed.append(len(pm.test_results))
+        
+        position = pd.Series(np.arange(expected.shape[0]), 
+                             index=pd.MultiIndex.from_frame(expected))
+        position = position[pd.MultiIndex.from_frame(pm.test_results)].values
+        assert_array_equal(np.sort(position), np.arange(expected.shape[0]))
+        for start, stop in zip(closed[:-1], closed[1:]):
+            self.assertTrue((np.diff(position[start:stop]) > 0).all())
+        
     def test_millisecond_timestamp(self):
         data_file = join(simpleexampledir,'simple.csv')
         df = pd.read_csv(data_file, index_col=0, parse_dates=True)
@@ -372,6 +640,76 @@ class Test_check_timestamp(unittest.TestCase):
             )
         assert_frame_equal(expected, self.pm.test_results, check_dtype=False)
 
+    def test_check_exact_times_true_no_reindex(self):
+        self.pm.check_timestamp(3600, exact_times=True, reindex=False)
+        expected = pd.DataFrame(
+            np.array([['', pd.Timestamp('2016-10-17 02:05:00'),
+                   pd.Timestamp('2016-10-17 03:05:00'), 2,
+                   'Missing timestamp']], dtype=object),
+            columns=['Variable Name', 'Start Time', 'End Time', 'Timesteps', 'Error Flag'],
+            index=pd.RangeIndex(start=0, stop=1, step=1)
+            )
+        assert_frame_equal(expected, self.pm.test_results, check_dtype=False)
+        
+        # Timestamps that are not on the expected frequency are kept
+        assert self.pm.df.shape == (3, 2)
+
+    def test_check_frequency_per_key(self):
+        # 10 second and 1 minute data, missing data at 00:00:20, 00:00:30, 
+        # and 00:02:00
+        index = pd.date_range('1/1/2017', periods=24, freq='10s')
+        df1 = pd.DataFrame({'A': np.arange(24.0), 'B': np.arange(24.0)}, index=index)
+        df1 = df1.drop(index[[2, 3]])
+        index = pd.date_range('1/1/2017', periods=4, freq='min')
+        df2 = pd.DataFrame({'C': [0.0, 1.0, np.nan, 3.0], 'D': np.arange(4.0)}, 
+                           index=index)
+        
+        pm = pecos.monitoring.PerformanceMonitoring()
+        pm.add_dataframe(df1)
+        pm.add_dataframe(df2)
+        pm.add_translation_dictionary({'Fast': ['A', 'B'], 'Slow': ['C', 'D']})
+        pm.check_timestamp({'Fast': 10, 'Slow': 60})
+        pm.check_missing()
+        
+        expected = pd.DataFrame(
+            np.array([['A', pd.Timestamp('2017-01-01 00:00:20'),
+                   pd.Timestamp('2017-01-01 00:00:30'), 2, 'Missing timestamp'],
+                      ['B', pd.Timestamp('2017-01-01 00:00:20'),
+                   pd.Timestamp('2017-01-01 00:00:30'), 2, 'Missing timestamp'],
+                      ['C', pd.Timestamp('2017-01-01 00:02:00'),
+                   pd.Timestamp('2017-01-01 00:02:00'), 1, 'Missing data']], dtype=object),
+            columns=['Variable Name', 'Start Time', 'End Time', 'Timesteps', 'Error Flag'],
+            index=pd.RangeIndex(start=0, stop=3, step=1)
+            )
+        assert_frame_equal(expected, pm.test_results, check_dtype=False)
+        assert pm.df.shape == (24, 4)
+
+    def test_duplicate_nonmonotonic(self):
+        index = pd.DatetimeIndex([pd.Timestamp('20161017 01:00:00'),
+                                  pd.Timestamp('20161017 03:00:00'),
+                                  pd.Timestamp('20161017 02:00:00'),
+                                  pd.Timestamp('20161017 03:00:00'),
+                                  pd.Timestamp('20161017 04:00:00')])
+        df = pd.DataFrame({'A': [0, 1, 2, 3, 4], 'B': [5, 6, 7, 8, 9]}, index=index)
+        pm = pecos.monitoring.PerformanceMonitoring()
+        pm.add_dataframe(df)
+        pm.check_timestamp(3600)
+
+        expected = pd.DataFrame(
+            np.array([['', pd.Timestamp('2016-10-17 02:00:00'),
+                    pd.Timestamp('2016-10-17 02:00:00'), 1, 'Nonmonotonic timestamp'],
+                      ['', pd.Timestamp('2016-10-17 03:00:00'),
+                    pd.Timestamp('2016-10-17 03:00:00'), 1, 'Duplicate timestamp']], dtype=object),
+            columns=['Variable Name', 'Start Time', 'End Time', 'Timesteps', 'Error Flag'],
+            index=pd.RangeIndex(start=0, stop=2, step=1)
+            )
+        assert_frame_equal(expected, pm.test_results, check_dtype=False)
+
+        # The first row with a duplicate timestamp is kept
+        expected = pd.DataFrame({'A': [0, 2, 1, 4], 'B': [5, 7, 6, 9]},
+                                index=index[[0, 2, 1, 4]])
+        assert_frame_equal(expected, pm.df, check_freq=False)
+
 
 class Test_check_delta(unittest.TestCase):
 
@@ -403,6 +741,28 @@ class Test_check_delta(unittest.TestCase):
         #pecos.graphics.plot_test_results(self.pm.df, self.pm.test_results, filename_root='test_deadsensor')
         assert_frame_equal(expected, self.pm.test_results, check_dtype=False)
         
+    def test_deadsensor_direction(self):
+        # dead sensor = < 1 in 5 hours, where the min occurs before the max
+        self.pm.check_delta([1, None], window=5*3600, direction='positive')
+        expected = pd.DataFrame(
+            np.array([['A', pd.Timestamp('2017-01-01 16:00:00'), pd.Timestamp('2017-01-01 22:00:00'), 7, 'Delta (+) < lower bound, 1']], dtype=object),
+            columns=['Variable Name', 'Start Time', 'End Time', 'Timesteps', 'Error Flag'],
+            index=pd.RangeIndex(start=0, stop=1, step=1)
+            )
+        assert_frame_equal(expected, self.pm.test_results, check_dtype=False)
+        
+        # dead sensor = < 1 in 5 hours, where the max occurs before the min
+        pm = pecos.monitoring.PerformanceMonitoring()
+        pm.add_dataframe(self.pm.df)
+        pm.check_delta([1, None], window=5*3600, direction='negative')
+        expected = pd.DataFrame(
+            np.array([['A', pd.Timestamp('2017-01-01 01:00:00'), pd.Timestamp('2017-01-01 08:00:00'), 8, 'Delta (-) < lower bound, 1'],
+                   ['A', pd.Timestamp('2017-01-01 18:00:00'), pd.Timestamp('2017-01-01 23:00:00'), 6, 'Delta (-) < lower bound, 1']], dtype=object),
+            columns=['Variable Name', 'Start Time', 'End Time', 'Timesteps', 'Error Flag'],
+            index=pd.RangeIndex(start=0, stop=2, step=1)
+            )
+        assert_frame_equal(expected, pm.test_results, check_dtype=False)
+        
     def test_increment_deadsensor(self):
         # As expected, check_increment does not produce the same results as check_delta
         self.pm.check_increment([1, None], 'A', increment=5)
@@ -560,8 +920,40 @@ class Test_check_outlier(unittest.TestCase):
                            check_dtype=False)
         
     def test_outlier_streaming(self):
-        # outlier if stdev > 1.9
-        pass
+        # Compare to the outlier test run with check_custom_streaming
+        def outlier(data_pt, history):
+            zt = (data_pt - history.mean())/history.std()
+            zt = zt.replace([np.inf, -np.inf], np.nan)
+            mask = (zt.abs() <= 1.9)
+            return mask, zt
+
+        np.random.seed(3427)
+        index = pd.date_range('1/1/2017', periods=500, freq='h')
+        data = np.random.normal(size=(500,3))
+        data[np.random.rand(500,3) < 0.05] = np.nan
+        data[100:130,1] = 5 # stagnant data
+        data[250:,2] = data[250:,2] + 10 # rebase
+        df = pd.DataFrame(data, index=index, columns=['A','B','C'])
+
+        for data in [self.pm.data, df]:
+            pm = pecos.monitoring.PerformanceMonitoring()
+            pm.add_dataframe(data)
+            pm.check_outlier([None, 1.9], window=12*3600, absolute_value=True,
+                             streaming=True)
+
+            expected = pecos.monitoring.check_custom_streaming(data, outlier,
+                                                12*3600, rebase=0.5)
+            assert_frame_equal(pm.mask, expected['mask'])
+
+        # Analyze the data in chunks, the history is carried between chunks
+        history = pecos.monitoring.StreamingHistory()
+        mask = []
+        for i in range(0, 500, 100):
+            results = pecos.monitoring.check_outlier(df.iloc[i:i+100], 
+                [None, 1.9], window=12*3600, absolute_value=True, 
+                streaming=True, history=history)
+            mask.append(results['mask'])
+        assert_frame_equal(pm.mask, pd.concat(mask), check_freq=False)
 
 
 class Test_check_custom(unittest.TestCase):
@@ -623,6 +1015,216 @@ class Test_check_custom(unittest.TestCase):
         percent = 1-results['test_results']['Timesteps'].sum()/N
         self.assertAlmostEqual(percent, 0.95, 2) # 95% within 2 std
 
+    def test_custom_streaming_raw(self):
+        
+        def custom_func(data_pt, history):
+            zt = (data_pt - history.mean())/history.std()
+            mask = zt.abs() <= 2
+            return mask, zt
+        
+        def raw_custom_func(data_pt, history):
+            zt = (data_pt - np.nanmean(history, axis=0))/np.nanstd(history, axis=0, ddof=1)
+            mask = np.abs(zt) <= 2
+            return mask, zt
+        
+        pm = pecos.monitoring.PerformanceMonitoring()
+        pm.add_dataframe(self.pm.df)
+        
+        metadata = self.pm.check_custom_streaming(custom_func, 50, rebase=0.5)
+        raw_metadata = pm.check_custom_streaming(raw_custom_func, 50, rebase=0.5, raw=True)
+        
+        assert_frame_equal(self.pm.test_results, pm.test_results)
+        assert_frame_equal(metadata.astype('float64'), raw_metadata, check_freq=False)
+
+    def test_custom_streaming_block(self):
+
+        def raw_custom_func(data_pt, history):
+            zt = (data_pt - np.nanmean(history, axis=0))/np.nanstd(history, axis=0, ddof=1)
+            mask = np.abs(zt) <= 2
+            return mask, zt
+
+        def block_custom_func(data_pts, history, window_start, window_end):
+            mask = np.ones(data_pts.shape, dtype=bool)
+            zt = np.zeros(data_pts.shape)
+            for k in range(data_pts.shape[0]):
+                mask[k], zt[k] = raw_custom_func(data_pts[k],
+                                    history[window_start[k]:window_end[k]])
+            return mask, zt
+
+        raw_metadata = self.pm.check_custom_streaming(raw_custom_func, 50,
+                                                      rebase=0.5, raw=True)
+        for block_size in [1, 10]:
+            pm = pecos.monitoring.PerformanceMonitoring()
+            pm.add_dataframe(self.pm.df)
+            block_metadata = pm.check_custom_streaming(block_custom_func, 50,
+                                    rebase=0.5, block_size=block_size)
+
+            assert_frame_equal(self.pm.test_results, pm.test_results)
+            assert_frame_equal(raw_metadata, block_metadata)
+
+    def test_custom_streaming_history(self):
+
+        def raw_custom_func(data_pt, history):
+            zt = (data_pt - np.nanmean(history, axis=0))/np.nanstd(history, axis=0, ddof=1)
+            mask = np.abs(zt) <= 2
+            return mask, zt
+
+        metadata = self.pm.check_custom_streaming(raw_custom_func, 50,
+                                                  rebase=0.5, raw=True)
+
+        # Analyze the data in chunks, the history is carried between chunks
+        history = pecos.monitoring.StreamingHistory(capacity=10)
+        chunk_metadata = []
+        for i in range(0, 1000, 200):
+            results = pecos.monitoring.check_custom_streaming(
+                self.pm.df.iloc[i:i+200], raw_custom_func, 50, rebase=0.5, 
+                raw=True, history=history)
+            chunk_metadata.append(results['metadata'])
+            # Only the last history window is stored
+            assert len(history) <= history.capacity
+        
+        assert_frame_equal(metadata, pd.concat(chunk_metadata), check_freq=False)
+        assert_frame_equal(history.data.iloc[:-1], 
+                           self.pm.cleaned_data.iloc[-len(history):-1], 
+                           check_freq=False)
+
+
+class Test_mask(unittest.TestCase):
+
+    @classmethod
+    def setUp(self):
+        index = pd.date_range('1/1/2017', periods=6, freq='h')
+        df = pd.DataFrame({'A': [0, 1, 2, 3, 4, 5], 'B': [5, 4, 3, 2, 1, 0]},
+                          index=index)
+
+        self.pm = pecos.monitoring.PerformanceMonitoring()
+        self.pm.add_dataframe(df)
+
+    @classmethod
+    def tearDown(self):
+        pass
+
+    def test_mask(self):
+        test_results = pd.DataFrame(
+            [('A', pd.Timestamp('2017-01-01 01:00:00'), pd.Timestamp('2017-01-01 02:00:00'), 2, 'Error'),
+             ('A', pd.Timestamp('2017-01-01 02:00:00'), pd.Timestamp('2017-01-01 03:00:00'), 2, 'Error'),
+             ('B', pd.Timestamp('2017-01-01 05:00:00'), pd.Timestamp('2017-01-01 05:00:00'), 1, 'Error'),
+             ('', pd.Timestamp('2017-01-01 00:00:00'), pd.Timestamp('2017-01-01 00:00:00'), 1, 'Missing timestamp'),
+             ('C', pd.Timestamp('2017-01-01 00:00:00'), pd.Timestamp('2017-01-01 06:00:00'), 7, 'Error')],
+            columns=['Variable Name', 'Start Time', 'End Time', 'Timesteps', 'Error Flag'])
+        self.pm.test_results = test_results
+
+        expected = pd.DataFrame({'A': [False, False, False, False, True, True],
+                                 'B': [False, True, True, True, True, False]},
+                                index=self.pm.df.index)
+        assert_frame_equal(self.pm.mask, expected)
+
+        # Non-monotonic index
+        self.pm.df = self.pm.df.iloc[[1,0,2,3,4,5]]
+        assert_frame_equal(self.pm.mask, expected.iloc[[1,0,2,3,4,5]])
+
+    def test_mask_cache(self):
+        mask = self.pm.mask
+        cleaned_data = self.pm.cleaned_data
+        self.assertIs(mask, self.pm.mask)
+        assert_frame_equal(cleaned_data, self.pm.cleaned_data)
+
+        # The cache is updated when test results change
+        self.pm.check_range([None, 4])
+        self.assertIsNot(mask, self.pm.mask)
+        self.assertEqual(self.pm.mask.sum().sum(), 10)
+        self.assertEqual(self.pm.cleaned_data.isnull().sum().sum(), 2)
+
+        # The cache is updated when data changes
+        self.pm.check_corrupt([0])
+        self.assertEqual(self.pm.mask.sum().sum(), 8)
+        self.assertEqual(self.pm.cleaned_data.isnull().sum().sum(), 4)
+
+        # The cache is updated when test results are edited in place
+        test_results = self.pm.test_results
+        test_results.loc[test_results['Error Flag'] == 'Corrupt data', 'Timesteps'] = 1
+        test_results.loc[test_results['Error Flag'] == 'Corrupt data', 'End Time'] = \
+            test_results.loc[test_results['Error Flag'] == 'Corrupt data', 'Start Time']
+        expected = self.pm._compute_mask()
+        assert_frame_equal(self.pm.mask, expected)
+        
+        test_results.drop(test_results.index, inplace=True)
+        self.assertEqual(self.pm.mask.sum().sum(), 12)
+        
+        # Data edited in place is included in the cleaned data
+        self.pm.df.iloc[0, 0] = -1
+        self.assertEqual(self.pm.cleaned_data.iloc[0, 0], -1)
+
+    def test_compact_mask(self):
+        test_results = pd.DataFrame(
+            [('A', pd.Timestamp('2017-01-01 01:00:00'), pd.Timestamp('2017-01-01 02:00:00'), 2, 'Error'),
+             ('A', pd.Timestamp('2017-01-01 02:00:00'), pd.Timestamp('2017-01-01 03:00:00'), 2, 'Error'),
+             ('B', pd.Timestamp('2017-01-01 05:00:00'), pd.Timestamp('2017-01-01 05:00:00'), 1, 'Error'),
+             ('', pd.Timestamp('2017-01-01 00:00:00'), pd.Timestamp('2017-01-01 00:00:00'), 1, 'Missing timestamp')],
+            columns=['Variable Name', 'Start Time', 'End Time', 'Timesteps', 'Error Flag'])
+        self.pm.test_results = test_results
+        
+        compact_mask = self.pm.compact_mask
+        self.assertIs(compact_mask, self.pm.compact_mask)
+        self.assertEqual(compact_mask.shape, (6, 2))
+        
+        start_row, stop_row = compact_mask.intervals('A')
+        assert_array_equal(start_row, [0])
+        assert_array_equal(stop_row, [4])
+        
+        assert_frame_equal(compact_mask.to_dataframe(), self.pm.mask)
+        assert_frame_equal(compact_mask[['B']].to_dataframe(), self.pm.mask[['B']])
+        assert_series_equal(compact_mask['B'], self.pm.mask['B'])
+        assert_frame_equal(compact_mask.apply(self.pm.df), self.pm.cleaned_data)
+        assert_series_equal(compact_mask.sum(), self.pm.mask.sum())
+        
+        tfilter = pd.Series([True, True, False, False, True, True], 
+                            index=self.pm.df.index)
+        assert_series_equal(compact_mask.sum(tfilter), 
+                            self.pm.mask[tfilter].sum())
+
+    def test_results_index(self):
+        test_results = pd.DataFrame(
+            [('A', pd.Timestamp('2017-01-01 02:00:00'), pd.Timestamp('2017-01-01 03:00:00'), 2, 'Error'),
+             ('A', pd.Timestamp('2017-01-01 01:00:00'), pd.Timestamp('2017-01-01 04:00:00'), 4, 'Error'),
+             ('B', pd.Timestamp('2017-01-01 05:00:00'), pd.Timestamp('2017-01-01 05:00:00'), 1, 'Error'),
+             ('', pd.Timestamp('2017-01-01 00:00:00'), pd.Timestamp('2017-01-01 00:00:00'), 1, 'Missing timestamp')],
+            columns=['Variable Name', 'Start Time', 'End Time', 'Timesteps', 'Error Flag'])
+        self.pm.test_results = test_results
+        
+        results_index = self.pm.results_index
+        self.assertIs(results_index, self.pm.results_index)
+        
+        overlapping = results_index.overlapping(pd.Timestamp('2017-01-01 04:00:00'),
+                                                pd.Timestamp('2017-01-01 05:00:00'))
+        assert_frame_equal(overlapping, test_results.iloc[[1,2]])
+        overlapping = results_index.overlapping(pd.Timestamp('2017-01-01 00:00:00'),
+                                                pd.Timestamp('2017-01-01 02:00:00'), 'A')
+        assert_frame_equal(overlapping, test_results.iloc[[0,1]])
+        self.assertEqual(results_index.overlapping(pd.Timestamp('2017-01-01 00:00:00'),
+                         pd.Timestamp('2017-01-01 06:00:00'), 'C').shape[0], 0)
+        
+        assert_frame_equal(results_index.error_flag('Missing timestamp'), 
+                           test_results.iloc[[3]])
+        
+        index = self.pm.df.index[[5,0,3,4,1,2]]
+        assert_array_equal(results_index.contains(index), 
+                           [True, True, True, True, True, True])
+        assert_array_equal(results_index.contains(index, 'A'), 
+                           [False, False, True, True, True, True])
+        assert_array_equal(results_index.contains(index, error_flag='Missing timestamp'), 
+                           [False, True, False, False, False, False])
+        
+        # Empty test results, start and end times are not datetime
+        self.pm.test_results = pd.DataFrame(columns=test_results.columns)
+        results_index = self.pm.results_index
+        for variable in [None, 'A']:
+            overlapping = results_index.overlapping(pd.Timestamp('2017-01-01 00:00:00'),
+                                                    pd.Timestamp('2017-01-01 06:00:00'), 
+                                                    variable)
+            self.assertEqual(overlapping.shape[0], 0)
+        assert_array_equal(results_index.contains(index), np.zeros(6, dtype=bool))
+
 
 class Test_append_test_results(unittest.TestCase):
 
@@ -644,16 +1246,45 @@ class Test_append_test_results(unittest.TestCase):
         
         self.pm._append_test_results(mask, 'None')
         
-        expected = pd.DataFrame(
-                np.array([['A', 0, 3, 4, 'None'],
-                       ['A', 5, 5, 1, 'None'],
-                       ['B', 7, 9, 3, 'None'],
-                       ['C', 0, 5, 6, 'None'],
-                       ['E', 8, 9, 2, 'None']], dtype=object),
-                columns=['Variable Name', 'Start Time', 'End Time', 'Timesteps', 'Error Flag'],
+        expected = pd.DataFrame({
+                'Variable Name': ['A', 'A', 'B', 'C', 'E'],
+                'Start Time': [0, 5, 7, 0, 8],
+                'End Time': [3, 5, 9, 5, 9],
+                'Timesteps': [4, 1, 3, 6, 2],
+                'Error Flag': ['None', 'None', 'None', 'None', 'None']},
                 index=range(5))
         assert_frame_equal(expected, self.pm.test_results)
 
+        # Blocks with fewer than min_failures timesteps are not reported
+        pm = pecos.monitoring.PerformanceMonitoring()
+        pm._append_test_results(mask, 'None', min_failures=3)
+        assert_frame_equal(expected.iloc[[0,2,3]].reset_index(drop=True), 
+                           pm.test_results)
+
+    def test_append_test_results_dtypes(self):
+        index = pd.date_range('1/1/2017', periods=4, freq='h', tz='MST')
+        mask = pd.DataFrame(True, columns=['A', 'B'], index=index)
+        mask.iloc[1:3, 0] = False
+        
+        self.pm._append_test_results(mask, 'Error 1')
+        self.pm._append_test_results(mask, 'Error 2', timestamp_test=True)
+        test_results = self.pm.test_results
+        
+        expected = pd.DataFrame({
+                'Variable Name': ['A', ''],
+                'Start Time': [index[1], index[1]],
+                'End Time': [index[2], index[2]],
+                'Timesteps': [2, 2],
+                'Error Flag': ['Error 1', 'Error 2']})
+        assert_frame_equal(expected, test_results)
+        self.assertEqual(test_results['Start Time'].dtype, index.dtype)
+        
+        # Test results are appended to the existing DataFrame
+        self.pm._append_test_results(mask, 'Error 3')
+        self.assertEqual(self.pm.test_results.shape[0], 3)
+        assert_frame_equal(expected, self.pm.test_results.iloc[0:2])
+        self.assertEqual(self.pm.test_results['Timesteps'].dtype, 'int64')
+
 
 if __name__ == '__main__':
     unittest.main()